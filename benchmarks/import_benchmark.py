@@ -0,0 +1,81 @@
+"""
+Cold-start check: import time of podcast_pipeline and of its --help.
+
+Runs each command --repeat times in a fresh interpreter, reports the median
+wall time and the slowest modules from -X importtime, and exits non-zero if
+the median import exceeds --budget-ms or if a provider SDK (or NumPy) was
+imported before any stage asked for it.
+
+    python benchmarks/import_benchmark.py --budget-ms 150
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE = "podcast_pipeline"
+LAZY_MODULES = ["anthropic", "requests", "google.cloud.texttospeech", "numpy"]  # Loaded only by the stages that use them
+
+def time_command(command, repeat):
+    """
+    Return the median wall seconds of running command in a fresh interpreter.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def import_profile():
+    """
+    Import the pipeline once under -X importtime and return (cumulative microseconds, module)
+    for every module it imported, plus the lazy modules that ended up in sys.modules.
+    """
+    check = f"import sys, {PIPELINE}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", check], cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (field.strip() for field in line[len("import time:"):].split("|"))
+        modules.append((int(cumulative), name.strip()))
+    loaded = [module for module in result.stdout.strip().split(",") if module]
+    return modules, loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per command")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="largest acceptable median import time")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    # Time the start-up users see after the first run, even where PYTHONDONTWRITEBYTECODE is set
+    subprocess.run([sys.executable, "-m", "compileall", "-q", PIPELINE], cwd=REPO_ROOT, check=True)
+    baseline = time_command([sys.executable, "-c", "pass"], args.repeat)
+    import_seconds = time_command([sys.executable, "-c", f"import {PIPELINE}"], args.repeat) - baseline
+    help_seconds = time_command([sys.executable, "-m", PIPELINE, "--help"], args.repeat) - baseline
+    modules, loaded = import_profile()
+
+    print(f"interpreter start-up: {baseline * 1000:8.1f} ms (subtracted below)")
+    print(f"import:               {import_seconds * 1000:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"--help:               {help_seconds * 1000:8.1f} ms")
+    print("\nslowest imports (cumulative):")
+    for microseconds, name in sorted(modules, reverse=True)[:args.top]:
+        print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if import_seconds * 1000 > args.budget_ms:
+        failures.append(f"import took {import_seconds * 1000:.1f} ms, over the {args.budget_ms:.0f} ms budget")
+    if loaded:
+        failures.append(f"imported at start-up instead of lazily: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
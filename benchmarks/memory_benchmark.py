@@ -0,0 +1,130 @@
+"""
+Peak-RSS check: buffered versus streamed download of line audio.
+
+Starts a local stub Eleven Labs server whose every line is --line-mb of MP3,
+sent in small writes, then synthesizes --lines file-backed lines on
+--workers threads in a fresh interpreter per variant: once with
+STREAM_TTS_AUDIO off (each response read whole, as before) and once with it
+on. Peak RSS is read from getrusage in each child, so the variants never
+share a high-water mark. Exits non-zero if streaming grows the peak by more
+than --max-growth-mb over the child's start-up.
+
+    python benchmarks/memory_benchmark.py --lines 16 --line-mb 8 --workers 4
+"""
+import argparse
+import importlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE = "podcast_pipeline"
+WRITE_BYTES = 16 * 1024  # The stub sends each body in writes of this size, like a server streaming audio
+
+def load_pipeline():
+    """
+    Import a fresh copy of the pipeline package, so every call starts from its default state.
+    """
+    for name in [name for name in sys.modules if name == PIPELINE or name.startswith(PIPELINE + ".")]:
+        del sys.modules[name]
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module(PIPELINE)
+
+def make_handler(line_bytes):
+    class StubTTSHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Allow keep-alive
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(line_bytes))
+            self.end_headers()
+            chunk = b"\xff\xfb" + b"\x00" * (WRITE_BYTES - 2)
+            for start in range(0, line_bytes, WRITE_BYTES):
+                self.wfile.write(chunk[:line_bytes - start])
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubTTSHandler
+
+def peak_rss_mb():
+    """
+    Return this process's peak resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS).
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+def run_child(url, streamed, lines, workers, chunk_kb):
+    """
+    Synthesize the lines in this process and print its start-up and final peak RSS as JSON.
+    """
+    pipeline = load_pipeline()
+    config = pipeline.config
+    with tempfile.TemporaryDirectory() as workdir:
+        config.ELEVEN_LABS_API_URL = url
+        config.AUDIO_CACHE_DIR = os.path.join(workdir, "audio_cache")
+        config.STREAM_TTS_AUDIO = streamed
+        config.TTS_CHUNK_BYTES = chunk_kb * 1024
+        config.RATE_LIMITS["elevenlabs"] = {"requests_per_second": None, "characters_per_minute": None}
+        pipeline.providers.get_http_session("elevenlabs")  # Import requests before the baseline is taken
+        jobs = [
+            {"line": i, "speaker": "Stub", "text": f"Line {i} of the memory benchmark.", "voices": {"elevenlabs": "stub"},
+             "output_file": os.path.join(workdir, f"line_{i}.mp3")}
+            for i in range(1, lines + 1)
+        ]
+        baseline = peak_rss_mb()
+        failed = sum(result["error"] is not None for result in pipeline.synthesis.synthesize_lines(iter(jobs), workers))
+        written = sum(os.path.getsize(job["output_file"]) for job in jobs if os.path.exists(job["output_file"]))
+    print(json.dumps({"baseline_mb": baseline, "peak_mb": peak_rss_mb(), "failed": failed, "written_mb": written / 1e6}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=16, help="lines synthesized per variant")
+    parser.add_argument("--line-mb", type=float, default=8.0, help="size of every line's audio")
+    parser.add_argument("--workers", type=int, default=4, help="lines synthesized in parallel")
+    parser.add_argument("--chunk-kb", type=int, default=64, help="TTS_CHUNK_BYTES for the streamed variant, in KB")
+    parser.add_argument("--max-growth-mb", type=float, default=32.0, help="largest acceptable peak RSS growth when streaming")
+    parser.add_argument("--child", choices=["buffered", "streamed"], help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.url, args.child == "streamed", args.lines, args.workers, args.chunk_kb)
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(int(args.line_mb * 1e6)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    results = {}
+    for variant in ("buffered", "streamed"):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", variant, "--url", url, "--lines", str(args.lines),
+             "--workers", str(args.workers), "--chunk-kb", str(args.chunk_kb)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[variant] = json.loads(output.strip().splitlines()[-1])
+    server.shutdown()
+
+    print(f"lines: {args.lines} x {args.line_mb:g} MB on {args.workers} workers, {args.chunk_kb} KB chunks")
+    print(f"{'variant':<9} {'start MB':>9} {'peak MB':>9} {'growth MB':>10} {'written MB':>11} {'failed':>6}")
+    for variant, result in results.items():
+        print(f"{variant:<9} {result['baseline_mb']:9.1f} {result['peak_mb']:9.1f} {result['peak_mb'] - result['baseline_mb']:10.1f} "
+              f"{result['written_mb']:11.1f} {result['failed']:6}")
+
+    streamed = results["streamed"]
+    if streamed["failed"] or streamed["peak_mb"] - streamed["baseline_mb"] > args.max_growth_mb:
+        print(f"FAIL: streaming grew peak RSS by {streamed['peak_mb'] - streamed['baseline_mb']:.1f} MB "
+              f"(limit {args.max_growth_mb:g} MB) or failed lines")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
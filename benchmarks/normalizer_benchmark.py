@@ -0,0 +1,70 @@
+"""
+Golden-output check and throughput benchmark for convert_numbers_to_words.
+
+Every entry in normalizer_golden.json must normalize to its expected text
+(the script exits non-zero otherwise); the corpus is then repeated to time
+line-by-line normalization against a single pass over the whole script.
+
+    python benchmarks/normalizer_benchmark.py --repeat 500
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+
+def load_module(name):
+    """
+    Import a module of the repository by dotted name.
+    """
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module(name)
+
+def check_golden(convert, corpus):
+    """
+    Return the corpus entries whose normalized output differs from the expected text.
+    """
+    return [(case, convert(case["input"])) for case in corpus if convert(case["input"]) != case["expected"]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="podcast_pipeline.text", help="module providing convert_numbers_to_words")
+    parser.add_argument("--repeat", type=int, default=200, help="copies of the golden corpus in the timed script")
+    args = parser.parse_args()
+
+    normalizer = load_module(args.module)
+    with open(os.path.join(BENCHMARK_DIR, "normalizer_golden.json")) as f:
+        corpus = json.load(f)
+
+    failures = check_golden(normalizer.convert_numbers_to_words, corpus)
+    for case, actual in failures:
+        print(f"MISMATCH: {case['input']!r}\n  expected: {case['expected']!r}\n  actual:   {actual!r}")
+    print(f"golden corpus: {len(corpus) - len(failures)}/{len(corpus)} passed")
+    if failures:
+        sys.exit(1)
+
+    lines = [case["input"] for case in corpus] * args.repeat
+    script_text = "\n".join(lines)
+
+    start = time.perf_counter()
+    for line in lines:
+        normalizer.convert_numbers_to_words(line)
+    per_line = time.perf_counter() - start
+
+    start = time.perf_counter()
+    normalizer.convert_numbers_to_words(script_text)
+    batch = time.perf_counter() - start
+
+    megabytes = len(script_text.encode("utf-8")) / 1e6
+    print(f"lines:              {len(lines)} ({megabytes:.2f} MB)")
+    print(f"line by line:       {len(lines) / per_line:12,.0f} lines/s  {megabytes / per_line:6.2f} MB/s")
+    print(f"whole-script batch: {len(lines) / batch:12,.0f} lines/s  {megabytes / batch:6.2f} MB/s")
+    print(f"token memo:         {normalizer.spell_number_token.cache_info()}")
+
+if __name__ == "__main__":
+    main()
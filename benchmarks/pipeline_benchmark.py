@@ -0,0 +1,535 @@
+"""
+End-to-end pipeline benchmark against local stand-ins for every external service.
+
+Starts one stub HTTP server that answers as SerpAPI (/search), Eleven Labs
+(/v1/voices, /v1/text-to-speech/{voice_id}[/stream]) and the Anthropic messages
+endpoint (/v1/messages, including SSE streaming), swaps Google's
+TextToSpeechClient for an in-process fake, then renders short, medium and
+long episodes on each set of text-to-speech backends (one backend, or several
+behind the router) and reports per-stage and end-to-end timings.
+Caches start cold for every render, so each run pays for every request.
+
+Each service's latency, jitter and error rate can be set per service
+(serp, voices, anthropic, elevenlabs, google); half of the injected failures
+are 429s (with Retry-After) or quota errors, the rest server errors:
+
+    python benchmarks/pipeline_benchmark.py --latency elevenlabs=400 --jitter elevenlabs=150 --errors google=0.05
+    python benchmarks/pipeline_benchmark.py --lengths long --backends google --json benchmarks/results.jsonl
+    python benchmarks/pipeline_benchmark.py --backends google google,elevenlabs --jitter google=600 --hedge
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import math
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import ModuleType, SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import anthropic
+from google.api_core import exceptions as google_exceptions
+from google.cloud import texttospeech
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE = "podcast_pipeline"
+BACKEND_SETS = ["elevenlabs", "google"]  # Default --backends; "google,elevenlabs" routes between both
+SCRIPT_LINES = {"short": 12, "medium": 40, "long": 100}  # Script lines the stub Claude writes per length
+SPEAKERS = [("Alice", "Female"), ("Bob", "Male")]
+STUB_DEFAULTS = {
+    # service: (latency ms, jitter ms, error rate)
+    "serp": (250, 50, 0.0),
+    "voices": (150, 30, 0.0),
+    "anthropic": (600, 100, 0.0),  # Time to first token; streamed chunks then arrive every --chunk-ms
+    "elevenlabs": (350, 100, 0.0),
+    "google": (300, 100, 0.0)
+}
+STUB_SENTENCES = [
+    "In 2023 the market grew 15% to $4.5 billion, the 3rd record year in a row.",
+    "That's roughly 1,250 new companies, and about 40 of them raised over $10 million.",
+    "Between 2019 and 2024 adoption went from 12% to 68%.",
+    "I think the 1st question everyone asks is whether that growth can last.",
+    "Honestly, the numbers surprised me when I read the report last week.",
+    "Let's dig into what that means for the 2 million people working in the field."
+]
+STUB_ARTICLES = 12  # Search results are drawn from this many articles, so sub-queries overlap
+
+def stub_search_results(query, num):
+    """
+    Return num results for a query from a shared pool of articles. Different queries share
+    some articles, and articles with the same sentence stand in for syndicated copies.
+    """
+    offset = zlib.crc32(query.encode("utf-8")) % STUB_ARTICLES
+    articles = [(offset + i) % STUB_ARTICLES for i in range(num)]
+    return [
+        {"link": f"https://example.com/article-{article}", "snippet": f"{STUB_SENTENCES[article % len(STUB_SENTENCES)]} Source {article // len(STUB_SENTENCES)}."}
+        for article in articles
+    ]
+
+def load_pipeline():
+    """
+    Import a fresh copy of the pipeline package, so every render starts from its default state.
+    """
+    for name in [name for name in sys.modules if name == PIPELINE or name.startswith(PIPELINE + ".")]:
+        del sys.modules[name]
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module(PIPELINE)
+
+class StubService:
+    """
+    Latency, jitter and error rate of one stand-in service.
+    """
+    def __init__(self, latency_ms, jitter_ms, error_rate):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    def wait(self):
+        time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+    def fails(self):
+        return random.random() < self.error_rate
+
+    def throttles(self):
+        """
+        Whether a failure is a 429 rather than a server error (half of them are).
+        """
+        return random.random() < 0.5
+
+def make_clips(seconds):
+    """
+    Render the stub "speech": a tone with a little silence at both ends, as MP3 and as raw 24 kHz PCM.
+    """
+    clips = {}
+    for name, output_args in (("mp3", ["-c:a", "libmp3lame", "-b:a", "128k", "-f", "mp3"]), ("pcm", ["-f", "s16le"])):
+        result = subprocess.run([
+            "ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=24000:duration={seconds}",
+            "-af", "adelay=200,apad=pad_dur=0.2", "-ac", "1", *output_args, "pipe:1"
+        ], capture_output=True, check=True)
+        clips[name] = result.stdout
+    return clips
+
+def stub_script(num_lines, start=0):
+    """
+    The script the stub Claude "writes": alternating speakers, heavy on numbers to exercise the normalizer.
+    Every line is numbered so none of them is served from the audio cache.
+    """
+    return "\n".join(
+        f"{SPEAKERS[i % len(SPEAKERS)][0]}: Point {i + 1}. {STUB_SENTENCES[i % len(STUB_SENTENCES)]}"
+        for i in range(start, start + num_lines)
+    )
+
+def stub_reply(prompt, num_lines):
+    """
+    Answer a script request, the outline and section requests of a sectioned script, or a
+    request to cut or extend a script.
+    """
+    if "numbers of the lines to cut" in prompt:
+        numbered = re.findall(r"^(\d+)\. ", prompt, re.MULTILINE)
+        return ", ".join(numbered[1::3])
+    extension = re.search(r"Write about (\d+) words of further discussion", prompt)
+    if extension:
+        return stub_script(math.ceil(int(extension.group(1)) / 15), 1000)
+    if "compact outline" in prompt:
+        sections = re.search(r"in this order: (.+?)\.", prompt).group(1).split(", ")
+        return "\n".join(f"{section}: stub plan for {section.lower()}" for section in sections)
+    section = re.search(r'Write only the "(.+?)" section', prompt)
+    if section:
+        sections = re.findall(r"^\s*(Intro|Round \d+|Conclusion):", prompt, re.MULTILINE)
+        per_section = math.ceil(num_lines / len(sections))
+        return stub_script(per_section, sections.index(section.group(1)) * per_section)
+    return stub_script(num_lines)
+
+def stub_usage(payload, prompt_cache):
+    """
+    Count a request's input tokens (about four characters each) the way prompt caching would:
+    the prefix up to each cache_control breakpoint is read from the cache if an earlier
+    request wrote it, and written to it otherwise.
+    """
+    system = payload.get("system") or []
+    blocks = system if isinstance(system, list) else [{"text": system}]
+    usage = {"input_tokens": 0, "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+    prefix, pending = "", 0
+    for block in blocks:
+        prefix += block["text"]
+        pending += len(block["text"]) // 4
+        if block.get("cache_control"):
+            usage["cache_read_input_tokens" if prefix in prompt_cache else "cache_creation_input_tokens"] += pending
+            prompt_cache.add(prefix)
+            pending = 0
+    usage["input_tokens"] = pending + sum(len(message["content"]) // 4 for message in payload["messages"])
+    return usage
+
+def make_handler(services, state):
+    class StubAPIHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Allow keep-alive
+        disable_nagle_algorithm = True  # Headers and body are separate writes
+
+        def send_body(self, status, body, content_type="application/json", headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_failure(self, service):
+            if service.throttles():
+                return self.send_body(429, {"detail": "stub rate limit"}, headers={"Retry-After": "1"})
+            self.send_body(503, {"detail": "stub failure"})
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            if path == "/search":
+                service = services["serp"]
+                service.wait()
+                if service.fails():
+                    return self.send_failure(service)
+                query = parse_qs(urlparse(self.path).query)
+                return self.send_body(200, {"organic_results": stub_search_results(query["q"][0], int(query["num"][0]))})
+            if path == "/v1/voices":
+                service = services["voices"]
+                service.wait()
+                if service.fails():
+                    return self.send_failure(service)
+                return self.send_body(200, {"voices": [
+                    {"name": name, "voice_id": f"stub-{name.lower()}", "labels": {"gender": gender.lower(), "description": "calm"}}
+                    for name, gender in SPEAKERS
+                ]})
+            self.send_body(404, {"error": "not found"})
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if path.startswith("/v1/text-to-speech/"):
+                service = services["elevenlabs"]
+                service.wait()
+                if service.fails():
+                    return self.send_failure(service)
+                if parse_qs(urlparse(self.path).query).get("output_format", [""])[0].startswith("pcm_"):
+                    return self.send_body(200, state["clips"]["pcm"], "audio/pcm")
+                return self.send_body(200, state["clips"]["mp3"], "audio/mpeg")
+            if path == "/v1/messages":
+                service = services["anthropic"]
+                service.wait()
+                if service.fails():
+                    return self.send_body(529, {"type": "error", "error": {"type": "overloaded_error", "message": "stub failure"}})
+                text = stub_reply(payload["messages"][-1]["content"], state["script_lines"])
+                usage = stub_usage(payload, state["prompt_cache"])
+                if payload.get("stream"):
+                    return self.stream_message(text, usage)
+                time.sleep(math.ceil(len(text.split(" ")) / 4) * state["chunk_seconds"])  # As long as streaming it would take
+                return self.send_body(200, {
+                    "id": "msg_stub", "type": "message", "role": "assistant", "model": payload.get("model"),
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn", "stop_sequence": None,
+                    "usage": {**usage, "output_tokens": len(text) // 4}
+                })
+            self.send_body(404, {"error": "not found"})
+
+        def stream_message(self, text, usage):
+            """
+            Send the script as server-sent events, a few words per delta, every --chunk-ms.
+            """
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            def event(kind, data):
+                self.wfile.write(f"event: {kind}\ndata: {json.dumps({'type': kind, **data})}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            event("message_start", {"message": {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": "stub", "content": [],
+                "stop_reason": None, "stop_sequence": None, "usage": {**usage, "output_tokens": 1}
+            }})
+            event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            words = text.split(" ")
+            for i in range(0, len(words), 4):
+                chunk = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+                event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": chunk}})
+                time.sleep(state["chunk_seconds"])
+            event("content_block_stop", {"index": 0})
+            event("message_delta", {"delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": len(text) // 4}})
+            event("message_stop", {})
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubAPIHandler
+
+def make_fake_tts_client(service, voices_service, state):
+    class FakeTextToSpeechClient:
+        """
+        Stands in for texttospeech.TextToSpeechClient, answering every request with the stub clip.
+        """
+        def list_voices(self, language_code=None):
+            voices_service.wait()
+            if voices_service.fails():
+                raise google_exceptions.ServiceUnavailable("stub failure")
+            return SimpleNamespace(voices=[
+                SimpleNamespace(name=f"en-US-Wavenet-{letter}", language_codes=["en-US"], ssml_gender=gender)
+                for letter, gender in zip("ABCDEF", [texttospeech.SsmlVoiceGender.MALE, texttospeech.SsmlVoiceGender.FEMALE] * 3)
+            ])
+
+        def synthesize_speech(self, input, voice, audio_config):
+            service.wait()
+            if service.fails():
+                raise (google_exceptions.ResourceExhausted if service.throttles() else google_exceptions.ServiceUnavailable)("stub failure")
+            if audio_config.audio_encoding == texttospeech.AudioEncoding.LINEAR16:
+                return SimpleNamespace(audio_content=state["wav"])
+            return SimpleNamespace(audio_content=state["clips"]["mp3"])
+
+    return FakeTextToSpeechClient
+
+class StageTimer:
+    """
+    Wrap the pipeline's stage functions to record when each stage starts and finishes.
+
+    Stages overlap when the script is streamed into text-to-speech, so times are
+    offsets from the start of the render rather than durations that add up.
+    """
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.marks = {}
+        self.line_seconds = []
+        self.wrap("get_research_text", "research")
+        self.wrap("generate_podcast_script", "script")
+        self.wrap_stream("stream_podcast_script", "script")
+        self.wrap_stream("generate_sectioned_script", "script")
+        self.wrap_lines("synthesize_line")
+        for name in ("combine_audio_files", "pipe_audio_to_ffmpeg", "write_progressive_output", "assemble_pcm"):
+            self.wrap(name, "assembly")
+
+    def now(self):
+        return time.perf_counter() - self.start
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.setdefault(name, self.now())
+
+    def replace(self, attr, make_wrapper):
+        """
+        Swap the function named attr for make_wrapper(original) in every pipeline module that calls it.
+        """
+        modules = [module for module in vars(self.pipeline).values() if isinstance(module, ModuleType)]
+        original = next(getattr(module, attr) for module in modules if hasattr(module, attr))
+        wrapper = make_wrapper(original)
+        for module in modules:
+            if getattr(module, attr, None) is original:
+                setattr(module, attr, wrapper)
+
+    def wrap(self, attr, stage):
+        def make_wrapper(original):
+            def timed(*args, **kwargs):
+                self.mark(f"{stage}_start")
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self.marks[f"{stage}_done"] = self.now()
+            return timed
+
+        self.replace(attr, make_wrapper)
+
+    def wrap_stream(self, attr, stage):
+        def make_wrapper(original):
+            def timed(*args, **kwargs):
+                self.mark(f"{stage}_start")
+                for chunk in original(*args, **kwargs):
+                    self.mark(f"{stage}_first_chunk")
+                    yield chunk
+                self.marks[f"{stage}_done"] = self.now()
+            return timed
+
+        self.replace(attr, make_wrapper)
+
+    def wrap_lines(self, attr):
+        def make_wrapper(original):
+            def timed(job):
+                self.mark("tts_start")
+                started = time.perf_counter()
+                try:
+                    return original(job)
+                finally:
+                    with self.lock:
+                        self.line_seconds.append(time.perf_counter() - started)
+                        self.marks["tts_done"] = self.now()
+            return timed
+
+        self.replace(attr, make_wrapper)
+
+def configure_pipeline(pipeline, url, state, services, workdir):
+    """
+    Point a freshly loaded pipeline at the stub server and give it cold caches in workdir.
+    """
+    config = pipeline.config
+    pipeline.providers.client = anthropic.Anthropic(api_key="stub", base_url=url)
+    config.SERP_API_URL = f"{url}/search"
+    config.RESEARCH_CACHE_FILE = os.path.join(workdir, "research_cache.db")
+    config.AUDIO_CACHE_DIR = os.path.join(workdir, "audio_cache")
+    config.VOICE_CATALOG_FILE = os.path.join(workdir, "voice_catalog.json")
+    config.DURATION_MODEL_FILE = os.path.join(workdir, "duration_model.db")
+    config.ELEVEN_LABS_API_URL = f"{url}/v1"
+    fake_client = make_fake_tts_client(services["google"], services["voices"], state)()
+    pipeline.backends.get_tts_client = lambda: fake_client
+
+def render(backends, length, url, state, services, assembly=None, hedge=False, duration_check="report", verbose=False):
+    """
+    Render one episode with a freshly loaded pipeline on a comma-separated set of backends and return its timings.
+    """
+    state["script_lines"] = SCRIPT_LINES[length]
+    with tempfile.TemporaryDirectory() as workdir:
+        pipeline = load_pipeline()
+        configure_pipeline(pipeline, url, state, services, workdir)
+        pipeline.config.TTS_BACKENDS = backends.split(",")
+        pipeline.config.HEDGE_REQUESTS = hedge
+        pipeline.config.DURATION_CHECK = duration_check  # "adjust" would hold synthesis back until the script is done
+        if assembly:
+            pipeline.config.ASSEMBLY_MODE = assembly
+        episode = {
+            "podcast_name": "Benchmark",
+            "topic": "The state of the benchmark industry",
+            "length": length,
+            "seed": 1,
+            "speakers": [{"name": name, "gender": gender, "voice": name} for name, gender in SPEAKERS],
+            "output_dir": os.path.join(workdir, "episode")
+        }
+        with contextlib.redirect_stdout(io.StringIO()) if not verbose else contextlib.nullcontext():
+            timer = StageTimer(pipeline)
+            params = pipeline.episode.build_episode_params(episode, 0)
+            summary = pipeline.stages.render_episode(params, params["output_dir"])
+            total = timer.now()
+
+    line_ms = sorted(seconds * 1000 for seconds in timer.line_seconds)
+    return {
+        "backends": backends,
+        "length": length,
+        "lines": len(line_ms),
+        "failed_lines": len(summary["failed_lines"]),
+        "research_s": timer.marks.get("research_done"),
+        "script_first_chunk_s": timer.marks.get("script_first_chunk"),
+        "script_done_s": timer.marks.get("script_done"),
+        "tts_done_s": timer.marks.get("tts_done"),
+        "tts_line_p50_ms": statistics.median(line_ms) if line_ms else None,
+        "tts_line_p95_ms": line_ms[int(len(line_ms) * 0.95) - 1] if line_ms else None,
+        "assembly_done_s": timer.marks.get("assembly_done"),
+        "prompt_cache_hit_rate": summary.get("prompt_cache_hit_rate"),
+        "backend_lines": summary.get("backend_lines"),
+        "tts_failovers": summary.get("tts_failovers"),
+        "hedged_requests": summary.get("hedged_requests"),
+        "hedge_wins": summary.get("hedge_wins"),
+        "predicted_seconds": summary.get("predicted_seconds"),
+        "actual_seconds": summary.get("actual_seconds"),
+        "research_tokens": pipeline.metrics.metrics["counters"].get("research_tokens"),
+        "total_s": total
+    }
+
+def parse_overrides(values, cast):
+    """
+    Parse repeated service=value options into a dict.
+    """
+    overrides = {}
+    for value in values or []:
+        service, _, number = value.partition("=")
+        if service not in STUB_DEFAULTS:
+            raise SystemExit(f"Unknown service {service!r}; expected one of {', '.join(STUB_DEFAULTS)}")
+        overrides[service] = cast(number)
+    return overrides
+
+def git_revision():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+def format_seconds(value):
+    return f"{value:8.2f}" if value is not None else f"{'-':>8}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=BACKEND_SETS, help="backend sets to render on, each one backend or several joined by commas")
+    parser.add_argument("--lengths", nargs="+", choices=list(SCRIPT_LINES), default=list(SCRIPT_LINES), help="episode lengths to render")
+    parser.add_argument("--repeat", type=int, default=1, help="renders per script and length")
+    parser.add_argument("--latency", action="append", metavar="SERVICE=MS", help="mean response latency of a service")
+    parser.add_argument("--jitter", action="append", metavar="SERVICE=MS", help="standard deviation of a service's latency")
+    parser.add_argument("--errors", action="append", metavar="SERVICE=RATE", help="fraction of a service's requests that fail")
+    parser.add_argument("--chunk-ms", type=float, default=20.0, help="delay between streamed script chunks")
+    parser.add_argument("--clip-seconds", type=float, default=1.0, help="length of the audio clip returned for every line")
+    parser.add_argument("--assembly", choices=["pipe", "files", "progressive", "hls", "pcm"], help="override the scripts' ASSEMBLY_MODE")
+    parser.add_argument("--hedge", action="store_true", help="enable hedged text-to-speech requests")
+    parser.add_argument("--duration-check", choices=["adjust", "reject", "report"], default="report", help="the scripts' DURATION_CHECK")
+    parser.add_argument("--json", metavar="PATH", help="append one JSON record per render to PATH, to track results over time")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    args = parser.parse_args()
+
+    latency = parse_overrides(args.latency, float)
+    jitter = parse_overrides(args.jitter, float)
+    errors = parse_overrides(args.errors, float)
+    services = {
+        name: StubService(latency.get(name, defaults[0]), jitter.get(name, defaults[1]), errors.get(name, defaults[2]))
+        for name, defaults in STUB_DEFAULTS.items()
+    }
+
+    # Every stubbed line returns the same real audio so ffmpeg has something to assemble
+    clips = make_clips(args.clip_seconds)
+    state = {
+        "clips": clips,
+        "wav": load_pipeline().audio.pcm_to_wav(clips["pcm"]),  # Google wraps LINEAR16 in a WAV header
+        "chunk_seconds": args.chunk_ms / 1000,
+        "prompt_cache": set()  # Shared by every render, like the real cache across episodes of one show
+    }
+    texttospeech.TextToSpeechClient = make_fake_tts_client(services["google"], services["voices"], state)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(services, state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    revision = git_revision()
+    results = []
+    print(f"{'backends':<17} {'length':<7} {'lines':>5} {'failed':>6} {'research':>8} {'1st tok':>8} {'script':>8} "
+          f"{'tts':>8} {'p50 ms':>8} {'p95 ms':>8} {'assemble':>8} {'total':>8} {'pcache':>6} {'hedged':>6} {'failover':>8}")
+    for backends in args.backends:
+        for length in args.lengths:
+            for _ in range(args.repeat):
+                result = render(backends, length, url, state, services, args.assembly, args.hedge, args.duration_check, args.verbose)
+                results.append(result)
+                print(f"{backends:<17} {length:<7} {result['lines']:>5} {result['failed_lines']:>6} "
+                      f"{format_seconds(result['research_s'])} {format_seconds(result['script_first_chunk_s'])} "
+                      f"{format_seconds(result['script_done_s'])} {format_seconds(result['tts_done_s'])} "
+                      f"{format_seconds(result['tts_line_p50_ms'])} {format_seconds(result['tts_line_p95_ms'])} "
+                      f"{format_seconds(result['assembly_done_s'])} {format_seconds(result['total_s'])} {result['prompt_cache_hit_rate']:>6.0%} "
+                      f"{result['hedged_requests']:>6} {result['tts_failovers']:>8}")
+    server.shutdown()
+    print("Stage columns are seconds from the start of the render (stages overlap while streaming).")
+
+    if args.json:
+        config = {
+            "services": {name: vars(service) for name, service in services.items()},
+            "chunk_ms": args.chunk_ms,
+            "clip_seconds": args.clip_seconds,
+            "hedge": args.hedge,
+            "duration_check": args.duration_check
+        }
+        with open(args.json, "a") as f:
+            for result in results:
+                f.write(json.dumps({"timestamp": datetime.now().isoformat(timespec="seconds"), "revision": revision, **config, **result}) + "\n")
+        print(f"Appended {len(results)} result(s) to {args.json}")
+
+if __name__ == "__main__":
+    main()
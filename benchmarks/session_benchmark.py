@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: per-line cost of a fresh connection versus the pooled provider session.
+
+Starts a local stub TTS server that sleeps for --handshake-ms on every new
+connection (standing in for the TCP + TLS handshake to a real provider), then
+posts the same number of "lines" with bare requests.post and with the
+keep-alive session from create_http_session().
+
+    python benchmarks/session_benchmark.py --lines 200 --handshake-ms 40
+"""
+import argparse
+import importlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINE = "podcast_pipeline"
+
+def load_pipeline():
+    """
+    Import a fresh copy of the pipeline package, so every call starts from its default state.
+    """
+    for name in [name for name in sys.modules if name == PIPELINE or name.startswith(PIPELINE + ".")]:
+        del sys.modules[name]
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    return importlib.import_module(PIPELINE)
+
+def make_handler(handshake_delay):
+    class StubTTSHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Allow keep-alive
+        disable_nagle_algorithm = True  # Headers and body are separate writes
+
+        def setup(self):
+            super().setup()
+            time.sleep(handshake_delay)  # Paid once per new connection
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            body = b"\xff\xfb" + b"\x00" * 1022
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubTTSHandler
+
+def run(post, url, lines):
+    """
+    Post `lines` requests through `post` and return the mean seconds per line.
+    """
+    start = time.perf_counter()
+    for i in range(lines):
+        response = post(url, json={"text": f"line {i}"})
+        response.raise_for_status()
+    return (time.perf_counter() - start) / lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=100, help="requests per variant")
+    parser.add_argument("--handshake-ms", type=float, default=30.0, help="simulated connection setup cost")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.handshake_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/text-to-speech/stub"
+
+    pipeline = load_pipeline()
+    session = pipeline.providers.create_http_session(pipeline.config.HTTP_POOL_SIZE)
+
+    fresh = run(requests.post, url, args.lines)
+    pooled = run(session.post, url, args.lines)
+    server.shutdown()
+
+    print(f"lines per variant:       {args.lines}")
+    print(f"fresh connection / line: {fresh * 1000:8.2f} ms")
+    print(f"pooled session / line:   {pooled * 1000:8.2f} ms")
+    print(f"saved per line:          {(fresh - pooled) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
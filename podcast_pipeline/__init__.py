@@ -0,0 +1,10 @@
+"""
+Generate a podcast episode with Claude and Google Cloud Text-to-Speech and/or Eleven Labs.
+
+Run it with `python -m podcast_pipeline`; settings live in podcast_pipeline/config.py.
+Importing the package loads only the standard library: provider SDKs and NumPy are
+imported by the stages that use them.
+"""
+from .cli import main
+
+__all__ = ["main"]
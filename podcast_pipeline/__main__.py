@@ -0,0 +1,6 @@
+import sys
+
+from .cli import main
+
+sys.argv[0] = "python -m podcast_pipeline"  # argparse names the program after argv[0], which is __main__.py here
+main()
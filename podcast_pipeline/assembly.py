@@ -0,0 +1,269 @@
+"""
+Episode assembly: ffmpeg concatenation, piping, progressive and HLS output, and PCM mixing.
+"""
+import subprocess
+import os
+import tempfile
+import io
+import wave
+
+from . import config
+from .providers import load_sdk
+
+np = None  # NumPy is imported by load_numpy() for ASSEMBLY_MODE = "pcm", on first use
+
+def load_numpy():
+    """
+    Import NumPy for the "pcm" assembly functions, which use it as np.
+    """
+    global np
+    if np is None:
+        np = load_sdk("numpy", "numpy", 'ASSEMBLY_MODE = "pcm"')
+    return np
+
+def combine_audio_files(file_list, output_file):
+    """
+    Concatenate line files into output_file with ffmpeg's concat demuxer, raising if ffmpeg fails.
+    """
+    # Create a text file with the list of audio files, next to the output so concurrent episodes never share it
+    list_file = os.path.join(os.path.dirname(output_file), "file_list.txt")
+    with open(list_file, "w") as f:
+        for file in file_list:
+            escaped_path = os.path.abspath(file).replace("'", "'\\''")
+            f.write(f"file '{escaped_path}'\n")
+    
+    # Use ffmpeg to concatenate the audio files
+    try:
+        result = subprocess.run([
+            "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_file, "-c", "copy", output_file
+        ], capture_output=True)
+    finally:
+        os.remove(list_file)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    print(f"Combined audio file saved as {output_file}")
+
+def pipe_audio_to_ffmpeg(audio_chunks, output_file):
+    """
+    Stream each line's MP3 audio, in order, through a single ffmpeg process into output_file.
+
+    Nothing is written to disk except the output, and only the lines currently in
+    flight are held in memory.
+    """
+    with tempfile.TemporaryFile() as ffmpeg_log:
+        process = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0", "-c", "copy", output_file],
+            stdin=subprocess.PIPE,
+            stderr=ffmpeg_log  # A file, so a chatty ffmpeg can never block on a full pipe
+        )
+        try:
+            for audio in audio_chunks:
+                process.stdin.write(audio)
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its exit code below says why
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            returncode = process.wait()
+        if returncode != 0:
+            ffmpeg_log.seek(0)
+            error = ffmpeg_log.read().decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg exited with code {returncode}: {error}")
+    print(f"Combined audio file saved as {output_file}")
+
+def write_hls_segments(audio, hls_dir, start_number):
+    """
+    Cut one line's MP3 audio into MPEG-TS segments and return their (filename, duration) pairs.
+    """
+    result = subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0", "-c", "copy",
+        "-f", "segment", "-segment_time", str(config.HLS_SEGMENT_SECONDS), "-segment_format", "mpegts",
+        "-segment_start_number", str(start_number), "-segment_list", "pipe:1", "-segment_list_type", "csv",
+        os.path.join(hls_dir, "segment_%05d.ts")
+    ], input=audio, capture_output=True)
+    if result.returncode != 0:
+        error = result.stderr.decode("utf-8", errors="replace").strip()
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {error}")
+    segments = []
+    for row in result.stdout.decode("utf-8").splitlines():
+        filename, start, end = row.split(",")
+        segments.append((filename, float(end) - float(start)))
+    return segments
+
+def write_hls_playlist(playlist_file, line_segments, finished):
+    """
+    Write an HLS event playlist listing every segment produced so far.
+    """
+    playlist = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{config.HLS_SEGMENT_SECONDS + 1}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:EVENT"
+    ]
+    for i, segments in enumerate(line_segments):
+        if i > 0:
+            playlist.append("#EXT-X-DISCONTINUITY")  # Timestamps restart with every line
+        for filename, duration in segments:
+            playlist.append(f"#EXTINF:{duration:.3f},")
+            playlist.append(filename)
+    if finished:
+        playlist.append("#EXT-X-ENDLIST")
+    temp_file = f"{playlist_file}.tmp"
+    with open(temp_file, "w") as f:
+        f.write("\n".join(playlist) + "\n")
+    os.replace(temp_file, playlist_file)  # Players polling the playlist never see a partial file
+
+def write_progressive_output(audio_chunks, output_file, hls_dir=None):
+    """
+    Append each line's MP3 audio to output_file as soon as every earlier line is done,
+    so the episode can be played while the rest is still being synthesized.
+    With hls_dir, every line is also cut into HLS segments and the playlist is updated.
+    """
+    if hls_dir:
+        os.makedirs(hls_dir, exist_ok=True)
+        for name in os.listdir(hls_dir):
+            if name.startswith("segment_") and name.endswith(".ts"):
+                os.remove(os.path.join(hls_dir, name))  # Left over from a previous run
+        playlist_file = os.path.join(hls_dir, "podcast.m3u8")
+        line_segments = []
+        next_segment = 0
+
+    with open(output_file, "wb") as out:
+        for audio in audio_chunks:
+            out.write(audio)
+            out.flush()
+            if hls_dir:
+                segments = write_hls_segments(audio, hls_dir, next_segment)
+                next_segment += len(segments)
+                line_segments.append(segments)
+                write_hls_playlist(playlist_file, line_segments, finished=False)
+
+    if hls_dir:
+        write_hls_playlist(playlist_file, line_segments, finished=True)
+        print(f"HLS playlist saved as {playlist_file}")
+    print(f"Combined audio file saved as {output_file}")
+
+def result_audio(result):
+    """
+    Return a result's audio, reading it back from its line file if it was written to disk.
+    """
+    if result["audio"] is not None:
+        return result["audio"]
+    with open(result["output_file"], "rb") as f:
+        return f.read()
+
+def decode_audio(audio):
+    """
+    Decode a line's audio to mono float32 samples at PCM_SAMPLE_RATE.
+    WAV in the expected format is read directly; anything else is decoded by ffmpeg.
+    """
+    if audio[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio)) as wav:
+            if (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, config.PCM_SAMPLE_RATE):
+                return np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2").astype(np.float32) / 32768
+    result = subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(config.PCM_SAMPLE_RATE), "pipe:1"
+    ], input=audio, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768
+
+def trim_silence(samples):
+    """
+    Cut leading and trailing silence, judged on the RMS of 10 ms frames, keeping a fade's worth of padding.
+    """
+    frame = config.PCM_SAMPLE_RATE // 100
+    frames = len(samples) // frame
+    if frames == 0:
+        return samples
+    rms = np.sqrt(np.mean(samples[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+    loud = np.flatnonzero(rms > 10 ** (config.PCM_SILENCE_THRESHOLD_DB / 20))
+    if loud.size == 0:
+        return samples[:0]
+    padding = int(config.PCM_FADE_SECONDS * config.PCM_SAMPLE_RATE)
+    return samples[max(0, loud[0] * frame - padding):min(len(samples), (loud[-1] + 1) * frame + padding)]
+
+def apply_fades(samples):
+    """
+    Fade a line in and out with equal-power ramps, so overlapping lines crossfade smoothly.
+    """
+    length = min(int(config.PCM_FADE_SECONDS * config.PCM_SAMPLE_RATE), len(samples) // 2)
+    if length == 0:
+        return samples
+    ramp = np.sin(np.linspace(0, np.pi / 2, length, dtype=np.float32))
+    samples = samples.copy()
+    samples[:length] *= ramp
+    samples[-length:] *= ramp[::-1]
+    return samples
+
+def speaker_gains(lines):
+    """
+    Return the gain that brings each speaker's overall RMS level to PCM_TARGET_DBFS.
+    """
+    energy = {}
+    for speaker, samples in lines:
+        total, length = energy.get(speaker, (0.0, 0))
+        energy[speaker] = (total + float(np.dot(samples, samples)), length + len(samples))
+    target = 10 ** (config.PCM_TARGET_DBFS / 20)
+    max_gain = 10 ** (config.PCM_MAX_GAIN_DB / 20)
+    return {speaker: min(max_gain, target / np.sqrt(total / length)) if total else 1.0 for speaker, (total, length) in energy.items()}
+
+def mix_lines(lines):
+    """
+    Lay (speaker, samples) lines out PCM_GAP_SECONDS apart at their speaker's gain, in one buffer.
+    """
+    gains = speaker_gains(lines)
+    gap = int(config.PCM_GAP_SECONDS * config.PCM_SAMPLE_RATE)
+    offsets = []
+    position = 0
+    for _, samples in lines:
+        offset = max(0, position + gap) if offsets else 0
+        offsets.append(offset)
+        position = offset + len(samples)
+    # With a negative gap a short line can end before the one it overlaps, so size for the furthest end
+    end = max((offset + len(samples) for (_, samples), offset in zip(lines, offsets)), default=0)
+    mixed = np.zeros(end, dtype=np.float32)
+    for (speaker, samples), offset in zip(lines, offsets):
+        mixed[offset:offset + len(samples)] += samples * gains[speaker]
+    return np.clip(mixed, -1.0, 1.0)
+
+def encode_pcm(samples, output_file):
+    """
+    Encode float samples into output_file with the PCM_OUTPUT_FORMAT encoder: the episode's only lossy encode.
+    """
+    pcm = (samples * 32767).astype("<i2").tobytes()
+    result = subprocess.run([
+        "ffmpeg", "-y", "-loglevel", "error", "-f", "s16le", "-ar", str(config.PCM_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+        *config.PCM_ENCODERS[config.PCM_OUTPUT_FORMAT], output_file
+    ], input=pcm, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+
+def assemble_pcm(results, output_file):
+    """
+    Decode and trim each line as it finishes, then mix the episode with gaps, fades and
+    per-speaker loudness and encode it once. The whole episode is held in memory as PCM.
+    """
+    load_numpy()
+    lines = []
+    for result in results:
+        samples = trim_silence(decode_audio(result_audio(result)))
+        if samples.size:
+            lines.append((result["speaker"], apply_fades(samples)))
+    if not lines:
+        raise RuntimeError("No audio to assemble")
+    encode_pcm(mix_lines(lines), output_file)
+    print(f"Combined audio file saved as {output_file}")
+
+def successful_results(results, failed_lines):
+    """
+    Pass through results that produced audio, recording the line numbers of those that did not.
+    """
+    for result in results:
+        if result["error"] is None:
+            yield result
+        else:
+            failed_lines.append(result["line"])
@@ -0,0 +1,152 @@
+"""
+Line audio on disk: the content-addressed audio cache and MP3/WAV helpers.
+"""
+import os
+import json
+import io
+import wave
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from . import config
+
+MP3_BITRATES = {  # Layer III bitrates in kbps by bitrate index, for MPEG-1 and for MPEG-2/2.5
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+}
+MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}  # By MPEG version bits
+audio_cache_lock = threading.Lock()
+audio_cache_stats = {"hits": 0, "misses": 0}
+
+def audio_cache_key(backend, voice, voice_settings, audio_encoding, text):
+    """
+    Hash everything that affects the rendered audio into a cache key.
+    """
+    normalized_text = " ".join(text.split())
+    payload = json.dumps([backend, voice, voice_settings, audio_encoding, normalized_text], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def audio_cache_open(key):
+    """
+    Open the cached audio for a key for reading, or return None on a cache miss.
+    """
+    path = os.path.join(config.AUDIO_CACHE_DIR, f"{key}.mp3")
+    try:
+        f = open(path, "rb")
+        os.utime(path)  # Mark the clip as recently used
+    except FileNotFoundError:
+        with audio_cache_lock:
+            audio_cache_stats["misses"] += 1
+        return None
+    with audio_cache_lock:
+        audio_cache_stats["hits"] += 1
+    return f
+
+def audio_cache_get(key):
+    """
+    Return the cached audio for a key, or None on a cache miss.
+    """
+    f = audio_cache_open(key)
+    if f is None:
+        return None
+    with f:
+        return f.read()
+
+@contextmanager
+def audio_cache_writer(key):
+    """
+    Yield a file to write a clip into; it enters the cache (evicting old clips if the cache
+    grew too large) only if the block finishes without an error.
+    """
+    os.makedirs(config.AUDIO_CACHE_DIR, exist_ok=True)
+    path = os.path.join(config.AUDIO_CACHE_DIR, f"{key}.mp3")
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"  # Unique across batch worker processes
+    try:
+        with open(temp_path, "wb") as f:
+            yield f
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)  # Readers never see a partially written clip
+    evict_audio_cache()
+
+def audio_cache_put(key, audio):
+    """
+    Store rendered audio in the cache and evict old clips if it grew too large.
+    """
+    with audio_cache_writer(key) as f:
+        f.write(audio)
+
+def evict_audio_cache():
+    """
+    Delete the least recently used clips until the cache fits in AUDIO_CACHE_MAX_BYTES.
+    """
+    with audio_cache_lock:
+        entries = []
+        for entry in os.scandir(config.AUDIO_CACHE_DIR):
+            if entry.name.endswith(".mp3"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= config.AUDIO_CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+def mp3_duration(f):
+    """
+    Return the seconds of MP3 audio in a binary file by walking its Layer III frame headers,
+    without decoding or reading the audio. ID3v2 tags (also those of concatenated clips) are
+    skipped; anything else that is not a frame ends the walk.
+    """
+    offset = 0
+    seconds = 0.0
+    while True:
+        f.seek(offset)
+        header = f.read(10)
+        if header[:3] == b"ID3" and len(header) == 10:
+            offset += 10 + (header[6] << 21 | header[7] << 14 | header[8] << 7 | header[9])
+            continue
+        if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+            break
+        version, layer = header[1] >> 3 & 3, header[1] >> 1 & 3
+        bitrate_index, rate_index = header[2] >> 4, header[2] >> 2 & 3
+        if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+            break
+        sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+        samples = 1152 if version == 3 else 576
+        offset += samples // 8 * MP3_BITRATES[version == 3][bitrate_index] * 1000 // sample_rate + (header[2] >> 1 & 1)
+        seconds += samples / sample_rate
+    return seconds
+
+def audio_duration(f):
+    """
+    Return the seconds of WAV or MP3 audio in a binary file, or None if it is neither.
+    """
+    if f.read(4) == b"RIFF":
+        f.seek(0)
+        with wave.open(f) as wav:
+            return wav.getnframes() / wav.getframerate()
+    f.seek(0)
+    return mp3_duration(f) or None
+
+def pcm_to_wav(pcm, sample_rate=None):
+    """
+    Wrap raw 16-bit mono PCM in a WAV header (at PCM_SAMPLE_RATE unless sample_rate is given).
+    """
+    sample_rate = sample_rate or config.PCM_SAMPLE_RATE
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
@@ -0,0 +1,261 @@
+"""
+Text-to-speech backends and their registry.
+"""
+import subprocess
+import json
+import time
+import io
+import wave
+import hashlib
+import math
+from contextlib import closing
+from functools import lru_cache
+
+from . import config
+from .metrics import count, timed_stage
+from .providers import get_http_session, get_tts_client, load_sdk, provider_calls, send_with_retries
+from .audio import audio_cache_get, audio_cache_key, audio_cache_open, audio_cache_put, audio_cache_writer, pcm_to_wav
+
+tts_backends = {}
+
+def fetch_google_voices():
+    """
+    Fetch every Google Cloud TTS voice, with its style taken from the voice type in its name.
+    """
+    texttospeech = load_sdk("google.cloud.texttospeech", "google-cloud-texttospeech", 'the "google" backend')
+    response = send_with_retries("google", lambda: get_tts_client().list_voices())
+    return [
+        {
+            "name": voice.name,
+            "languages": list(voice.language_codes),
+            "gender": texttospeech.SsmlVoiceGender(voice.ssml_gender).name.capitalize(),
+            # "en-US-Wavenet-D" -> "wavenet", "en-US-Neural2-A" -> "neural2"
+            "styles": [voice.name.split("-")[2].lower()] if voice.name.count("-") >= 3 else []
+        }
+        for voice in response.voices
+    ]
+
+def fetch_elevenlabs_voices():
+    """
+    Fetch the Eleven Labs voices, with gender, language and styles taken from their labels.
+    """
+    url = f"{config.ELEVEN_LABS_API_URL}/voices"
+    headers = {
+        "Accept": "application/json",
+        "xi-api-key": config.ELEVEN_LABS_API_KEY
+    }
+    response = send_with_retries("elevenlabs", lambda: get_http_session("elevenlabs").get(url, headers=headers))
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.status_code} {response.text}")
+    catalog = []
+    for voice in response.json()["voices"]:
+        labels = voice.get("labels") or {}
+        catalog.append({
+            "name": voice["name"],
+            "voice_id": voice["voice_id"],
+            "languages": [labels.get("language", "en")],
+            "gender": labels.get("gender", "").capitalize(),
+            "styles": [value.lower() for key, value in labels.items() if key in ("description", "use case", "use_case", "accent", "age") and value]
+        })
+    return catalog
+
+def fetch_stub_voices():
+    """
+    List the stub backend's voices: one low and one high tone per gender.
+    """
+    return [
+        {"name": f"stub-{gender.lower()}-{pitch}", "languages": ["en-US"], "gender": gender, "styles": []}
+        for gender in ("Male", "Female") for pitch in ("low", "high")
+    ]
+
+def google_synthesize(text, voice_name):
+    """
+    Synthesize text with Google Cloud Text-to-Speech and return the MP3 audio (WAV in "pcm" mode).
+    Pause markers become SSML <break> tags.
+    """
+    texttospeech = load_sdk("google.cloud.texttospeech", "google-cloud-texttospeech", 'the "google" backend')
+    language_code = "-".join(voice_name.split("-")[:2])  # "en-US-Wavenet-D" speaks "en-US"
+    if config.ASSEMBLY_MODE == "pcm":
+        # LINEAR16 comes back as a WAV file
+        audio_encoding, sample_rate = texttospeech.AudioEncoding.LINEAR16, config.PCM_SAMPLE_RATE
+    else:
+        audio_encoding, sample_rate = texttospeech.AudioEncoding.MP3, config.MP3_SAMPLE_RATE
+    ssml = None
+    if config.PAUSE_MARKER in text:
+        from xml.sax.saxutils import escape
+        pause_tag = f'<break time="{int(config.PAUSE_SECONDS * 1000)}ms"/>'
+        ssml = f"<speak>{escape(text).replace(config.PAUSE_MARKER, pause_tag)}</speak>"
+    # Key on the SSML actually sent, so a changed PAUSE_SECONDS is not served from the cache
+    cache_key = audio_cache_key("google", voice_name, {"language_code": language_code}, f"{audio_encoding.name}:{sample_rate}", ssml or text)
+    audio = audio_cache_get(cache_key)
+    if audio is None:
+        # Reuse a pooled client instead of opening a new gRPC channel per line
+        client = get_tts_client()
+
+        # Set the text input
+        synthesis_input = texttospeech.SynthesisInput(ssml=ssml) if ssml else texttospeech.SynthesisInput(text=text)
+
+        # Configure the voice
+        voice = texttospeech.VoiceSelectionParams(
+            language_code=language_code,
+            name=voice_name  # Choose a voice from https://cloud.google.com/text-to-speech/docs/voices
+        )
+
+        # Configure the audio format
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=audio_encoding,  # Output format
+            sample_rate_hertz=sample_rate
+        )
+
+        # Generate the speech
+        count("tts_requests")
+        count("tts_characters", len(text))
+        with timed_stage("tts_request"):
+            response = send_with_retries("google", lambda: client.synthesize_speech(
+                input=synthesis_input,
+                voice=voice,
+                audio_config=audio_config
+            ), len(text))
+        audio = response.audio_content
+        audio_cache_put(cache_key, audio)
+    return audio
+
+def elevenlabs_request(text, voice_id, output_format=None, stream=False):
+    """
+    Send one Eleven Labs text-to-speech request and return the response, raising unless it succeeded.
+    With stream=True the streaming endpoint is used and the body is left unread; the response
+    holds its request slot until it is closed.
+    """
+    url = f"{config.ELEVEN_LABS_API_URL}/text-to-speech/{voice_id}{'/stream' if stream else ''}"
+    headers = {
+        "Accept": "audio/mpeg",
+        "xi-api-key": config.ELEVEN_LABS_API_KEY,
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "text": text,
+        "voice_settings": config.ELEVEN_LABS_VOICE_SETTINGS
+    }
+    count("tts_requests")
+    count("tts_characters", len(text))
+    params = {"output_format": output_format} if output_format else None  # Raw 16-bit PCM instead of MP3
+    with timed_stage("tts_request"):
+        response = send_with_retries("elevenlabs", lambda: get_http_session("elevenlabs").post(url, headers=headers, params=params, data=json.dumps(payload), stream=stream), len(text), stream)
+    if response.status_code != 200:
+        with closing(response):
+            raise RuntimeError(f"Eleven Labs returned {response.status_code}: {response.text}")
+    return response
+
+def elevenlabs_synthesize(text, voice_id):
+    """
+    Synthesize text with Eleven Labs and return the MP3 audio (WAV in "pcm" mode).
+    Pause markers are spoken as "...", or with ELEVEN_LABS_PAUSES = "silence" the pieces
+    between them are synthesized separately and joined with silence.
+    """
+    if config.PAUSE_MARKER in text:
+        if config.ELEVEN_LABS_PAUSES == "silence":
+            return synthesize_with_silences(voice_id, text)
+        text = text.replace(config.PAUSE_MARKER, "...")
+
+    output_format = f"pcm_{config.PCM_SAMPLE_RATE}" if config.ASSEMBLY_MODE == "pcm" else None
+    cache_key = audio_cache_key("elevenlabs", voice_id, config.ELEVEN_LABS_VOICE_SETTINGS, output_format or "audio/mpeg", text)
+    audio = audio_cache_get(cache_key)
+    if audio is not None:
+        return audio
+
+    response = elevenlabs_request(text, voice_id, output_format)
+    audio = pcm_to_wav(response.content) if output_format else response.content
+    audio_cache_put(cache_key, audio)
+    return audio
+
+def elevenlabs_stream(text, voice_id):
+    """
+    Synthesize text with Eleven Labs' streaming endpoint, yielding the MP3 in chunks of up to
+    TTS_CHUNK_BYTES as they arrive. "pcm" mode and spliced silences need the whole clip
+    (its WAV header, or the pieces) and fall back to elevenlabs_synthesize.
+    """
+    if config.ASSEMBLY_MODE == "pcm" or (config.PAUSE_MARKER in text and config.ELEVEN_LABS_PAUSES == "silence"):
+        yield elevenlabs_synthesize(text, voice_id)
+        return
+    text = text.replace(config.PAUSE_MARKER, "...")
+    cache_key = audio_cache_key("elevenlabs", voice_id, config.ELEVEN_LABS_VOICE_SETTINGS, "audio/mpeg", text)
+    cached = audio_cache_open(cache_key)
+    if cached is not None:
+        with cached:
+            yield from iter(lambda: cached.read(config.TTS_CHUNK_BYTES), b"")
+        return
+
+    response = elevenlabs_request(text, voice_id, stream=True)
+    # The clip only enters the cache once its last chunk has arrived
+    with closing(response), audio_cache_writer(cache_key) as cache_file:
+        for chunk in response.iter_content(config.TTS_CHUNK_BYTES):
+            cache_file.write(chunk)
+            yield chunk
+
+@lru_cache(maxsize=None)
+def silent_mp3(seconds):
+    """
+    Generate an MP3 clip of silence matching the backends' MP3 format.
+    """
+    result = subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"anullsrc=r={config.MP3_SAMPLE_RATE}:cl=mono", "-t", str(seconds),
+        "-c:a", "libmp3lame", "-b:a", "128k", "-id3v2_version", "0", "-write_xing", "0", "-f", "mp3", "pipe:1"
+    ], capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    return result.stdout
+
+def synthesize_with_silences(voice_id, text):
+    """
+    Synthesize the text between pause markers separately and join the pieces with silence.
+    """
+    pieces = [elevenlabs_synthesize(segment, voice_id) for segment in text.split(config.PAUSE_MARKER) if segment.strip()]
+    if config.ASSEMBLY_MODE == "pcm":
+        frames = []
+        for piece in pieces:
+            with wave.open(io.BytesIO(piece)) as wav:
+                frames.append(wav.readframes(wav.getnframes()))
+        return pcm_to_wav(bytes(2 * int(config.PAUSE_SECONDS * config.PCM_SAMPLE_RATE)).join(frames))
+    return silent_mp3(config.PAUSE_SECONDS).join(pieces)
+
+def stub_synthesize(text, voice):
+    """
+    Render a line offline as a quiet tone lasting as long as the line would take to say,
+    pitched by voice, for dry runs and benchmarks without provider credentials.
+    """
+    time.sleep(config.STUB_LATENCY_SECONDS)
+    provider_calls.sent = getattr(provider_calls, "sent", 0) + 1  # The stub has no cache; every line is a request
+    count("tts_requests")
+    count("tts_characters", len(text))
+    seconds = max(0.5, len(text.split()) / config.STUB_WORDS_PER_SECOND)
+    period = 100 + int(hashlib.sha256(voice.encode("utf-8")).hexdigest(), 16) % 60  # Samples per cycle, so the tone loops exactly
+    cycle = b"".join(int(3000 * math.sin(2 * math.pi * i / period)).to_bytes(2, "little", signed=True) for i in range(period))
+    pcm = cycle * (int(seconds * config.PCM_SAMPLE_RATE) // period)
+    if config.ASSEMBLY_MODE == "pcm":
+        return pcm_to_wav(pcm)
+    result = subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", str(config.PCM_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0", "-ar", str(config.MP3_SAMPLE_RATE),
+        "-c:a", "libmp3lame", "-b:a", "128k", "-id3v2_version", "0", "-write_xing", "0", "-f", "mp3", "pipe:1"
+    ], input=pcm, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {result.returncode}: {result.stderr.decode('utf-8', errors='replace').strip()}")
+    return result.stdout
+
+def register_backend(name, label, synthesize, fetch_voices, voice_key="name", stream=None):
+    """
+    Make a text-to-speech backend available to TTS_BACKENDS.
+
+    synthesize(text, voice) returns one line's audio (MP3, or WAV at PCM_SAMPLE_RATE in "pcm"
+    mode) and raises on failure; text may contain PAUSE_MARKER. fetch_voices() returns the
+    backend's catalog entries, each with "name", "languages", "gender" and "styles", and
+    voice_key names the entry field that synthesize() expects as its voice.
+    The optional stream(text, voice) yields the same audio in chunks as it downloads; lines
+    written to files use it (with STREAM_TTS_AUDIO) so they are never held whole in memory.
+    """
+    tts_backends[name] = {"label": label, "synthesize": synthesize, "fetch_voices": fetch_voices, "voice_key": voice_key, "stream": stream}
+
+register_backend("google", "Google Cloud TTS", google_synthesize, fetch_google_voices)
+
+register_backend("elevenlabs", "Eleven Labs", elevenlabs_synthesize, fetch_elevenlabs_voices, "voice_id", elevenlabs_stream)
+
+register_backend("stub", "Stub", stub_synthesize, fetch_stub_voices)
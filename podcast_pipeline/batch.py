@@ -0,0 +1,52 @@
+"""
+Batch rendering of the episodes in a job file.
+"""
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from . import config
+from .episode import build_episode_params, load_job_file
+from .stages import render_episode
+
+def render_job(params, resume=False, profile=False, enqueue=False):
+    """
+    Render one batch episode in a worker process, turning failures into report entries.
+    """
+    try:
+        summary = render_episode(params, params["output_dir"], resume, profile, enqueue)
+        if enqueue:
+            return {**summary, "status": "queued"}
+        return {**summary, "status": "ok" if not summary["failed_lines"] else "partial"}
+    except Exception as e:
+        return {"podcast_name": params["podcast_name"], "topic": params["topic"], "seed": params["seed"], "status": "failed", "error": str(e)}
+
+def run_batch(job_file, max_workers=None, resume=False, profile=False, enqueue=False):
+    """
+    Render every episode in a job file without prompting, several at a time in a process pool,
+    so research, scripting and synthesis of different episodes overlap.
+    """
+    job = load_job_file(job_file)
+    episodes = job["episodes"] if isinstance(job, dict) else job
+    defaults = job.get("defaults", {}) if isinstance(job, dict) else {}
+    episode_params = [build_episode_params({**defaults, **episode}, i) for i, episode in enumerate(episodes, start=1)]
+    with ProcessPoolExecutor(max_workers=max_workers or config.BATCH_MAX_WORKERS) as executor:
+        report = list(executor.map(render_job, episode_params, *([option] * len(episode_params) for option in (resume, profile, enqueue))))
+
+    with open(config.BATCH_REPORT_FILE, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n" + "="*50)
+    print("BATCH SUMMARY")
+    print("="*50)
+    for entry in report:
+        if entry["status"] == "queued":
+            detail = f"{entry['queued_lines']} lines queued for {entry['output_file']}"
+        else:
+            detail = entry.get("error") or f"{entry['output_file']} ({entry['seconds']}s, {len(entry['failed_lines'])} failed lines)"
+        print(f"[{entry['status']}] {entry['podcast_name']}: {detail}")
+    read = sum(entry.get("prompt_cache_read_tokens", 0) for entry in report)
+    prompt_tokens = sum(entry.get("prompt_tokens", 0) for entry in report)
+    saved = sum(entry.get("prompt_tokens_saved", 0) for entry in report)
+    print(f"Prompt cache: {read} of {prompt_tokens} prompt tokens read from cache, {saved} input tokens saved")
+    print(f"Report saved as {config.BATCH_REPORT_FILE}")
+    return report
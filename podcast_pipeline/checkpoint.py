@@ -0,0 +1,89 @@
+"""
+Run directory manifests, so interrupted runs can resume.
+"""
+import os
+import json
+import threading
+import itertools
+
+from . import config
+
+manifest_lock = threading.RLock()
+
+def load_manifest(run_dir):
+    """
+    Load the checkpoint manifest of a run directory, or None if it has none.
+    """
+    try:
+        with open(os.path.join(run_dir, "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_manifest(run_dir, manifest):
+    """
+    Atomically write the checkpoint manifest, so a crash never leaves it half-written.
+    """
+    if not config.CHECKPOINT_RUNS:
+        return
+    with manifest_lock:
+        manifest_file = os.path.join(run_dir, "manifest.json")
+        with open(f"{manifest_file}.tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+
+def record_line(run_dir, manifest, job, error):
+    """
+    Record a line's synthesis status in the manifest as soon as it finishes.
+    """
+    with manifest_lock:
+        manifest["lines"][str(job["line"])] = {
+            "speaker": job["speaker"],
+            "text": job["text"],
+            "voices": job["voices"],
+            "backend": job.get("backend"),
+            "output_file": job["output_file"],
+            "status": "failed" if error else "done",
+            "error": str(error) if error else None
+        }
+    save_manifest(run_dir, manifest)
+
+def reusable_record(record, job):
+    """
+    Whether a manifest line record holds finished audio for a job: the same text and voices,
+    in a file (whatever a rerender named it) that still exists in the job's audio format.
+    """
+    return bool(
+        record and record["status"] == "done" and record["text"] == job["text"] and record["voices"] == job["voices"]
+        and job["output_file"] and record["output_file"] and os.path.exists(record["output_file"])
+        and os.path.splitext(record["output_file"])[1] == os.path.splitext(job["output_file"])[1]
+    )
+
+def unused_line_file(output_file, held):
+    """
+    Return output_file, or the first "_rN" variant of its name not in held, so newly
+    synthesized audio never overwrites a file another line's record still points to.
+    """
+    root, extension = os.path.splitext(output_file)
+    for n in itertools.count(1):
+        if output_file not in held:
+            return output_file
+        output_file = f"{root}_r{n}{extension}"
+
+def mark_completed_lines(jobs, manifest):
+    """
+    Flag jobs whose audio an earlier attempt already rendered, so they are not synthesized again.
+    A line is only reused if its text and voice are unchanged and its file still exists;
+    it keeps the file its record names.
+    """
+    held = {record["output_file"]: line for line, record in manifest["lines"].items() if record.get("output_file")}
+    for job in jobs:
+        record = manifest["lines"].get(str(job["line"]))
+        job["resumed"] = reusable_record(record, job)
+        if job["resumed"]:
+            job["output_file"], job["backend"] = record["output_file"], record.get("backend")
+        elif job["output_file"]:
+            # The line's own stale file may be overwritten, but not one a later line still uses
+            job["output_file"] = unused_line_file(job["output_file"], {file for file, line in held.items() if line != str(job["line"])})
+            held[job["output_file"]] = str(job["line"])
+        yield job
@@ -0,0 +1,94 @@
+"""
+The command line interface.
+"""
+import os
+import argparse
+import sys
+
+from . import config
+from .metrics import prompt_cache_summary, reset_metrics, write_metrics
+from .research import get_research_text
+from .backends import tts_backends
+from .episode import get_user_input
+from .router import backend_summary
+from .stages import assemble_run, new_run_dir, render_episode, rerender_run, script_run, synthesize_run
+from .batch import run_batch
+from .work_queue import run_worker
+
+COMMANDS = ("research", "script", "synthesize", "assemble", "render", "rerender")
+
+def main(backends=None, argv=None):
+    """
+    Run the command line interface; backends sets the default for --backends.
+    Without a subcommand the arguments are those of `render`, as before subcommands existed.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["render"] + argv
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--backends", nargs="+", choices=list(tts_backends), default=backends or config.TTS_BACKENDS, help="text-to-speech backends to give speakers voices on (workers: to claim lines for), in order of preference")
+    common.add_argument("--hedge", action="store_true", help="duplicate lines that run past their backend's p95 latency")
+    parser = argparse.ArgumentParser(description="Generate a podcast episode with Claude and Google Cloud Text-to-Speech and/or Eleven Labs.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    research = commands.add_parser("research", parents=[common], help="print the research text for a topic")
+    research.add_argument("topic")
+    script = commands.add_parser("script", parents=[common], help="research and write the script of a new (or unfinished) run")
+    script.add_argument("run_dir", nargs="?", help="continue this run instead of prompting for a new episode")
+    synthesize = commands.add_parser("synthesize", parents=[common], help="synthesize the line files of a scripted run")
+    synthesize.add_argument("run_dir")
+    assemble = commands.add_parser("assemble", parents=[common], help="combine a run's synthesized lines into the episode")
+    assemble.add_argument("run_dir")
+    rerender = commands.add_parser("rerender", parents=[common], help="re-render a run from its edited script, synthesizing only changed lines")
+    rerender.add_argument("run_dir")
+    rerender.add_argument("script_file", nargs="?", help="the edited script (default: script.txt in the run directory, written there on first use)")
+    render = commands.add_parser("render", parents=[common], help="run every stage (the default command)")
+    render.add_argument("--batch", metavar="JOB_FILE", help="render every episode in a JSON/YAML job file without prompting")
+    render.add_argument("--workers", type=int, default=config.BATCH_MAX_WORKERS, help="episodes rendered in parallel in batch mode")
+    render.add_argument("--resume", metavar="RUN_DIR", nargs="?", const=True, help="continue an interrupted run (in batch mode, resume every episode's directory)")
+    render.add_argument("--profile", action="store_true", help="save cProfile and tracemalloc output in the run directory")
+    render.add_argument("--enqueue", action="store_true", help="publish lines to the work queue instead of synthesizing them")
+    render.add_argument("--worker", action="store_true", help="synthesize and assemble queued lines from the work queue")
+    render.add_argument("--idle-timeout", type=float, help="stop a worker after the queue has been empty this many seconds")
+    args = parser.parse_args(argv)
+    config.TTS_BACKENDS = args.backends
+    config.HEDGE_REQUESTS = config.HEDGE_REQUESTS or args.hedge
+    if args.command in ("script", "synthesize", "assemble", "rerender") and not config.CHECKPOINT_RUNS:
+        raise SystemExit(f"The {args.command} stage hands its output on through a run directory; set CHECKPOINT_RUNS = True")
+    if args.command == "render" and args.resume is True and not args.batch:
+        render.error("--resume needs RUN_DIR unless --batch is given")
+
+    if args.command == "research":
+        print(get_research_text(args.topic))
+        return
+    if args.command in ("script", "synthesize", "assemble", "rerender"):
+        # Each stage writes its own run report, as render does for the whole pipeline
+        reset_metrics()
+        run_dir = args.run_dir
+        if args.command == "script":
+            run_dir = script_run(args.run_dir)
+            summary = {}
+        elif args.command == "synthesize":
+            summary = {"failed_lines": synthesize_run(run_dir)}
+        elif args.command == "assemble":
+            summary = {"output_file": assemble_run(run_dir)}
+        else:
+            summary = {"output_file": rerender_run(run_dir, args.script_file)}
+        write_metrics(run_dir, {"command": args.command, **summary, **prompt_cache_summary(), **backend_summary()})
+        print(f"Run report saved to {os.path.join(run_dir, config.METRICS_REPORT_FILE)}")
+        return
+    if args.worker:
+        run_worker(config.TTS_MAX_WORKERS, args.idle_timeout)
+        return
+    if args.batch:
+        run_batch(args.batch, args.workers, bool(args.resume), args.profile, args.enqueue)
+        return
+    if isinstance(args.resume, str):
+        render_episode({}, args.resume, resume=True, profile=args.profile, enqueue=args.enqueue)
+        return
+
+    print("Welcome to Podcast Generator!\n")
+    
+    # Get user input and assign voices
+    params = get_user_input()
+    render_episode(params, new_run_dir(params), profile=args.profile, enqueue=args.enqueue)
@@ -0,0 +1,188 @@
+"""
+Settings for every stage of the pipeline. Other modules read them as config.NAME at call time,
+so a caller (or a benchmark) can change one after import.
+"""
+import os
+
+# Anthropic configuration
+ANTHROPIC_API_KEY = "ANTHROPIC API KEY"  # Replace with your Anthropic API key
+SCRIPT_MODEL = "claude-3-opus-20240229"
+STREAM_SCRIPT = True  # Start synthesizing lines while the script is still being generated
+PROMPT_CACHING = True  # Cache the show prefix and episode brief of the system prompt with Anthropic prompt caching
+SECTIONED_SCRIPT_LENGTHS = ("long",)  # Lengths written as an outline plus concurrently generated sections
+SECTION_MAX_WORKERS = 6  # Sections requested from Claude at once
+SECTION_MAX_TOKENS = 2500
+
+# Serp API configuration
+SERP_API_KEY = "SERP API KEY"  # Replace with your Serp API key
+SERP_API_URL = "https://serpapi.com/search"
+
+# Research cache configuration
+RESEARCH_CACHE_FILE = "research_cache.db"
+RESEARCH_CACHE_TTL = 60 * 60  # Seconds a cached search is served as fresh
+RESEARCH_CACHE_STALE_TTL = 24 * 60 * 60  # Older entries up to this age are served while refreshing in the background
+
+# Duration estimate configuration
+# "adjust" asks Claude to cut or extend a script predicted to miss its length by more than DURATION_TOLERANCE,
+# "reject" refuses to synthesize it, "report" only compares predicted and actual length. The first two wait
+# for the whole script before synthesis starts, giving up streaming the script into TTS, early playback and
+# section pipelining; "report" (or None, which skips the estimate) keeps streaming, so it is the default.
+DURATION_CHECK = "report"
+DURATION_TOLERANCE = 0.15  # Fraction of the target length a script may run over or under
+DURATION_MAX_REVISIONS = 2  # Cut or extend requests before the script is synthesized as it is
+DURATION_MODEL_FILE = "duration_model.db"  # Measured words and seconds of every voice's rendered lines
+DEFAULT_WORDS_PER_SECOND = 2.5  # Speaking rate assumed for a voice (and backend) nothing has been measured for
+DURATION_PRIOR_WORDS = 300  # Weight of that assumption, in words; a voice's own measurements dominate past it
+DURATION_OUTRO_LINES = 3  # Closing lines an extension is inserted before
+
+# Research compaction configuration
+RESEARCH_QUERIES = ["{topic}", "{topic} statistics", "{topic} latest research", "{topic} history", "{topic} criticism"]  # Sub-queries searched concurrently
+RESEARCH_RESULTS_PER_QUERY = 5
+RESEARCH_MAX_WORKERS = 5
+RESEARCH_TOKEN_BUDGET = 1000  # Tokens of research the episode brief may hold
+RESEARCH_DUPLICATE_SIMILARITY = 0.6  # Word-trigram Jaccard similarity above which two snippets are duplicates
+RESEARCH_RANK_OFFSET = 60  # k in reciprocal rank fusion, 1 / (k + rank); larger values flatten the ranking
+CHARS_PER_TOKEN = 4  # Rough English average, for budgeting text before it is sent
+
+# Speech idiosyncrasy configuration
+FILLERS = ["hmm", "uhh", "umm", "well", "you know", "like"]
+PAUSES = ["...", ",", "."]
+IDIOSYNCRASY_PROFILES = {  # Chance per word of adding a filler or a pause, by speaker personality
+    "default": {"filler_rate": 0.1, "pause_rate": 0.05},
+    "Expert": {"filler_rate": 0.03, "pause_rate": 0.04},
+    "Storyteller": {"filler_rate": 0.06, "pause_rate": 0.08},
+    "Debater": {"filler_rate": 0.05, "pause_rate": 0.03},
+    "Comedian": {"filler_rate": 0.1, "pause_rate": 0.06},
+    "Skeptic": {"filler_rate": 0.08, "pause_rate": 0.06},
+    "Enthusiast": {"filler_rate": 0.12, "pause_rate": 0.03}
+}
+PAUSE_STYLE = "marker"  # "marker" lets each backend render pauses itself; "text" inserts "...", "," and "." tokens
+PAUSE_MARKER = "\ue000"  # Private-use character marking a pause in "marker" mode
+PAUSE_SECONDS = 0.4
+EPISODE_SEED = None  # Fixed seed for reproducible (and cacheable) speech patterns; None picks one per episode
+
+# Speaker defaults used when details are not given
+DEFAULT_NAMES = ["Alex Smith", "Jordan Taylor", "Morgan Riley", "Casey Brown", "Taylor White", "Jamie Carter", "Drew Mitchell"]
+DEFAULT_GENDERS = ["Male", "Female"]
+DEFAULT_TITLES = ["Journalist", "Analyst", "Professor", "Researcher", "Author"]
+DEFAULT_PERSONALITIES = {
+    "Expert": "Precise and fact-driven, citing research and breaking down complex topics with confidence.",
+    "Storyteller": "Expressive and immersive, captivating audiences with vivid anecdotes.",
+    "Debater": "Analytical and provocative, challenging viewpoints to spark discussion.",
+    "Comedian": "Witty and sarcastic, entertaining with humor and sharp observations.",
+    "Skeptic": "Thoughtful and questioning, seeking evidence before accepting claims.",
+    "Enthusiast": "Passionate and energetic, diving deep into niche interests with excitement."
+}
+DEFAULT_VOICES = {  # Voice per gender when a backend's catalog cannot be loaded
+    "google": {"Male": "en-US-Wavenet-D", "Female": "en-US-Wavenet-F"}
+}
+
+# Voice catalog configuration
+VOICE_CATALOG_FILE = "voice_catalog.json"  # Voices per provider, cached so start-up needs no network round-trip
+VOICE_CATALOG_TTL = 7 * 24 * 60 * 60  # Seconds before the catalog is fetched again
+AUTO_ASSIGN_VOICES = True  # Pick each speaker's voice from the catalog by gender and personality instead of asking
+VOICE_LANGUAGE = "en"  # Language auto-assigned voices must speak
+PERSONALITY_STYLES = {  # Voice styles preferred for each personality, best first, per backend
+    "google": {
+        "Expert": ["news", "studio", "wavenet"],
+        "Storyteller": ["studio", "journey", "wavenet"],
+        "Debater": ["neural2", "wavenet"],
+        "Comedian": ["casual", "neural2"],
+        "Skeptic": ["neural2", "wavenet"],
+        "Enthusiast": ["journey", "casual", "neural2"]
+    },
+    "elevenlabs": {
+        "Expert": ["authoritative", "news", "deep", "calm"],
+        "Storyteller": ["narration", "warm", "expressive"],
+        "Debater": ["confident", "intense", "deep"],
+        "Comedian": ["casual", "playful", "conversational"],
+        "Skeptic": ["calm", "raspy", "conversational"],
+        "Enthusiast": ["energetic", "upbeat", "excited"]
+    }
+}
+
+# Batch mode configuration
+BATCH_MAX_WORKERS = 2  # Episodes rendered in parallel, each in its own process
+BATCH_REPORT_FILE = "batch_report.json"
+
+# Checkpoint configuration
+CHECKPOINT_RUNS = True  # Keep a manifest and per-line audio in each run directory so --resume can continue it
+RUNS_DIR = "runs"  # Interactive runs get a timestamped directory here
+
+# Work queue configuration
+QUEUE_FILE = "work_queue.db"  # SQLite queue of line synthesis tasks, shared by every --worker process
+QUEUE_JOURNAL_MODE = "wal"  # WAL needs every worker on one host; use "delete" on network storage with working locks
+QUEUE_LEASE_SECONDS = 120  # A claimed line or assembly is handed to another worker if not finished in time
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_POLL_SECONDS = 1.0
+
+# Set the path to your Google Cloud service account key
+os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = "path/to/your/service-account-key.json"
+
+# Eleven Labs API configuration
+ELEVEN_LABS_API_KEY = "ELEVEN LABS API KEY"
+ELEVEN_LABS_API_URL = "https://api.elevenlabs.io/v1"
+ELEVEN_LABS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.5
+}
+ELEVEN_LABS_PAUSES = "text"  # "text" speaks pause markers as "..."; "silence" splices in generated silence (a request per piece)
+
+# Text-to-speech backends
+TTS_BACKENDS = ["google", "elevenlabs"]  # Backends speakers get voices on, in order of preference ("stub" renders tones offline)
+MP3_SAMPLE_RATE = 44100  # Every backend's MP3 uses Eleven Labs' rate, so lines from different backends concatenate
+STUB_LATENCY_SECONDS = 0.0  # Simulated request time of the "stub" backend
+STUB_WORDS_PER_SECOND = 2.5  # Speaking rate of the "stub" backend's tones
+ROUTER_EWMA_ALPHA = 0.2  # Weight of the newest request in a backend's latency and error rate averages
+ROUTER_ERROR_PENALTY = 4.0  # A backend's expected latency is scaled by 1 + this * its error rate
+ROUTER_SWITCH_MARGIN = 1.5  # Leave a speaker's preferred backend only for one this much better, so voices rarely change mid-episode
+ROUTER_WINDOW = 200  # Recent request latencies kept per backend for the hedging percentile
+HEDGE_REQUESTS = False  # Duplicate a line on its next backend (or the same one) once it runs past the HEDGE_PERCENTILE latency
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # Requests a backend must have answered before its lines are hedged
+FAILOVER_RETRY_ATTEMPTS = 1  # Retries on a backend before a line fails over to the next one (the last backend gets RETRY_ATTEMPTS)
+STREAM_TTS_AUDIO = True  # Write line files chunk by chunk as they download, on backends that can stream
+TTS_CHUNK_BYTES = 64 * 1024  # Bytes read from a streaming response (and written to the line file) at a time
+
+# Text-to-speech concurrency
+TTS_MAX_WORKERS = 4  # Number of lines synthesized in parallel
+# "pipe" streams audio into one ffmpeg process; "files" writes per-line MP3s for the concat demuxer;
+# "progressive" appends lines to a growing MP3 as they finish; "hls" also publishes HLS segments;
+# "pcm" requests uncompressed audio and mixes the episode with NumPy (trimmed, gapped, loudness-matched)
+ASSEMBLY_MODE = "pipe"
+HLS_DIR = "podcast_hls"  # Playlist and segments written in "hls" mode
+HLS_SEGMENT_SECONDS = 10
+PCM_SAMPLE_RATE = 24000  # "pcm" mode requests raw 16-bit mono audio at this rate and mixes it with NumPy
+PCM_OUTPUT_FORMAT = "mp3"  # "mp3" or "opus"; the mixed episode is encoded once, at the end
+PCM_ENCODERS = {"mp3": ["-c:a", "libmp3lame", "-b:a", "128k"], "opus": ["-c:a", "libopus", "-b:a", "64k"]}
+PCM_SILENCE_THRESHOLD_DB = -45  # 10 ms frames quieter than this are trimmed from the ends of each line
+PCM_GAP_SECONDS = 0.3  # Silence between turns; a negative gap overlaps turns as a crossfade
+PCM_FADE_SECONDS = 0.015  # Fade at each end of a line, so edits never click
+PCM_TARGET_DBFS = -20.0  # RMS level every speaker is normalized to
+PCM_MAX_GAIN_DB = 12.0
+
+# Audio cache configuration
+AUDIO_CACHE_DIR = ".audio_cache"  # Rendered lines are stored here, keyed by content hash
+AUDIO_CACHE_MAX_BYTES = 500 * 1024 * 1024  # Least recently used clips are evicted above this size
+
+# Provider session configuration
+HTTP_POOL_SIZE = 8  # Keep-alive connections held open per provider
+TTS_CLIENT_POOL_SIZE = 2  # Long-lived gRPC channels shared by all synthesis threads
+
+# Metrics configuration
+METRICS_REPORT_FILE = "run_report.json"  # Per-run JSON report, written in the run directory
+METRICS_TEXTFILE = "podcast.prom"  # Prometheus textfile (for node_exporter's textfile collector)
+METRICS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # Stage latency histogram bounds, in seconds
+
+# Rate limit configuration
+RATE_LIMITS = {  # Per provider token buckets; None leaves that dimension unlimited
+    "google": {"requests_per_second": 15, "characters_per_minute": 150000},
+    "elevenlabs": {"requests_per_second": 5, "characters_per_minute": None},
+    "serpapi": {"requests_per_second": 5, "characters_per_minute": None}  # Lets one episode's research sub-queries go out together
+}
+MAX_CONCURRENT_REQUESTS = 6  # Provider requests in flight at once, across all providers
+RETRY_ATTEMPTS = 5  # Retries of a throttled or transiently failing request before giving up
+RETRY_BASE_DELAY = 0.5  # Seconds; the backoff ceiling doubles with each attempt
+RETRY_MAX_DELAY = 30.0
+RATE_LIMIT_BACKOFF = 0.5  # Factor a provider's request rate is cut by after a 429
+RATE_LIMIT_RECOVERY = 0.05  # Fraction of the configured rate won back after each success
@@ -0,0 +1,113 @@
+"""
+Episode length prediction from measured speaking rates.
+"""
+import sqlite3
+import io
+import wave
+import threading
+import re
+from contextlib import closing
+
+from . import config
+from .audio import audio_duration
+from .backends import tts_backends
+
+duration_model_lock = threading.Lock()
+
+def open_duration_model():
+    """
+    Open the duration model database, creating its table on first use.
+    """
+    db = sqlite3.connect(config.DURATION_MODEL_FILE, timeout=30)
+    db.execute("CREATE TABLE IF NOT EXISTS voice_durations (backend TEXT, voice TEXT, lines INTEGER, words INTEGER, seconds REAL, PRIMARY KEY (backend, voice))")
+    return db
+
+def load_duration_model():
+    """
+    Return the measured {"lines", "words", "seconds"} of every (backend, voice), and of every
+    backend under (backend, None).
+    """
+    with duration_model_lock, closing(open_duration_model()) as db:
+        rows = db.execute("SELECT backend, voice, lines, words, seconds FROM voice_durations").fetchall()
+    model = {}
+    for backend, voice, lines, words, seconds in rows:
+        model[(backend, voice)] = {"lines": lines, "words": words, "seconds": seconds}
+        totals = model.setdefault((backend, None), {"lines": 0, "words": 0, "seconds": 0.0})
+        totals["lines"] += lines
+        totals["words"] += words
+        totals["seconds"] += seconds
+    return model
+
+def count_words(text):
+    """
+    Count the spoken words of a line's text.
+    """
+    return len(re.findall(r"[\w']+", text))
+
+def speech_seconds(text, seconds):
+    """
+    Return the seconds of a line spent speaking, leaving out its pause markers' silences.
+    """
+    return max(0.0, seconds - text.count(config.PAUSE_MARKER) * config.PAUSE_SECONDS)
+
+def record_line_duration(backend, voice, text, audio=None, audio_file=None):
+    """
+    Measure a freshly synthesized line (from audio, or from audio_file) and fold it into
+    the duration model of the voice that rendered it.
+    """
+    try:
+        if audio is not None:
+            seconds = audio_duration(io.BytesIO(audio))
+        else:
+            with open(audio_file, "rb") as f:
+                seconds = audio_duration(f)
+    except (OSError, EOFError, wave.Error) as e:
+        print(f"Could not measure a line of {tts_backends[backend]['label']} voice {voice}: {e}")
+        return
+    words = count_words(text)
+    if not seconds or not words:
+        return
+    with duration_model_lock, closing(open_duration_model()) as db, db:
+        db.execute(
+            "INSERT INTO voice_durations (backend, voice, lines, words, seconds) VALUES (?, ?, 1, ?, ?) "
+            "ON CONFLICT (backend, voice) DO UPDATE SET lines = lines + 1, words = words + excluded.words, seconds = seconds + excluded.seconds",
+            (backend, voice, words, speech_seconds(text, seconds))
+        )
+
+def predict_line_seconds(job, model):
+    """
+    Predict a line's spoken length on its speaker's preferred backend from its words and pauses.
+
+    The voice's seconds per word is its measured average, shrunk toward its backend's average
+    (itself shrunk toward DEFAULT_WORDS_PER_SECOND) by DURATION_PRIOR_WORDS, so a voice with
+    few measured lines is not trusted too early.
+    """
+    backends = [backend for backend in job["voices"] if backend in config.TTS_BACKENDS and backend in tts_backends] or list(job["voices"])
+    backend = backends[0]
+    seconds_per_word = 1 / config.DEFAULT_WORDS_PER_SECOND
+    for key in ((backend, None), (backend, job["voices"][backend])):
+        measured = model.get(key)
+        if measured:
+            seconds_per_word = (measured["seconds"] + config.DURATION_PRIOR_WORDS * seconds_per_word) / (measured["words"] + config.DURATION_PRIOR_WORDS)
+    return count_words(job["text"]) * seconds_per_word + job["text"].count(config.PAUSE_MARKER) * config.PAUSE_SECONDS
+
+def episode_seconds(line_seconds):
+    """
+    Add up the lengths of an episode's lines, with the gaps "pcm" mode puts between turns.
+    """
+    gaps = config.PCM_GAP_SECONDS * max(0, len(line_seconds) - 1) if config.ASSEMBLY_MODE == "pcm" else 0.0
+    return sum(line_seconds) + gaps
+
+def predict_episode_seconds(jobs, model):
+    """
+    Predict an episode's length from its line jobs.
+    """
+    return episode_seconds([predict_line_seconds(job, model) for job in jobs])
+
+def predict_lines(jobs, model, predicted):
+    """
+    Pass jobs through, appending each line's predicted seconds to predicted.
+    """
+    for job in jobs:
+        predicted.append(predict_line_seconds(job, model))
+        yield job
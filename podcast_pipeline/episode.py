@@ -0,0 +1,120 @@
+"""
+Episode parameters, from the interactive prompts or a batch job file.
+"""
+import random
+import os
+import json
+import re
+
+from . import config
+from .backends import tts_backends
+from .voices import assign_speaker_voices, choose_speaker_voices, voice_display_name
+
+def get_user_input():
+    podcast_name = input("Enter podcast name: ")
+    topic = input("Enter podcast topic: ")
+    num_speakers = int(input("Number of speakers (1-3): "))
+    length = input("Podcast length (short/medium/long): ").lower()
+    
+    customize_speakers = input("Would you like to choose the name, gender, title, and personality for the speakers? (yes/no): ").strip().lower()
+    
+    speakers = []
+    for i in range(num_speakers):
+        if customize_speakers == "yes":
+            print(f"\nEnter details for Speaker {i+1} (Press Enter to auto-generate):")
+            name = input("Name: ") or random.choice(config.DEFAULT_NAMES)
+            gender = input("Gender: ") or random.choice(config.DEFAULT_GENDERS)
+            title = input("Title: ") or random.choice(config.DEFAULT_TITLES)
+            personality = input("Personality (Expert/Storyteller/Debater/Comedian/Skeptic/Enthusiast): ") or random.choice(list(config.DEFAULT_PERSONALITIES.keys()))
+        else:
+            name = random.choice(config.DEFAULT_NAMES)
+            gender = random.choice(config.DEFAULT_GENDERS)
+            title = random.choice(config.DEFAULT_TITLES)
+            personality = random.choice(list(config.DEFAULT_PERSONALITIES.keys()))
+        
+        # Assign a voice on every backend to the speaker
+        if config.AUTO_ASSIGN_VOICES:
+            voices = assign_speaker_voices({"name": name}, gender, personality, speakers)
+        else:
+            print(f"\nAssigning voices for {name}...")
+            voices = assign_speaker_voices({"name": name, "voices": choose_speaker_voices(name)}, gender, personality, speakers)
+        for backend, voice in voices.items():
+            print(f"Assigned {tts_backends[backend]['label']} voice {voice_display_name(backend, voice)} to {name}.")
+        
+        speakers.append({
+            "name": name,
+            "gender": gender,
+            "title": title,
+            "personality": personality,
+            "description": config.DEFAULT_PERSONALITIES[personality],
+            "voices": voices  # Voice per backend, in order of preference
+        })
+    
+    return {
+        "podcast_name": podcast_name,
+        "topic": topic,
+        "num_speakers": num_speakers,
+        "length": length,
+        "speakers": speakers
+    }
+
+def determine_length_details(length):
+    """
+    Define podcast length details based on user input.
+    """
+    length_config = {
+        "short": {"duration": 5, "rebuttals": 1},  # 5 minutes, 1 round
+        "medium": {"duration": 10, "rebuttals": 5},  # 10 minutes, 5 rounds
+        "long": {"duration": 20, "rebuttals": 8}  # 20 minutes, 8 rounds
+    }
+    return length_config[length]
+
+def slugify(text):
+    """
+    Turn a podcast name or topic into a safe directory name.
+    """
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "episode"
+
+def load_job_file(job_file):
+    """
+    Load a batch job file (JSON, or YAML if PyYAML is installed).
+    """
+    with open(job_file) as f:
+        if job_file.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("PyYAML is required for YAML job files: pip install pyyaml")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def build_episode_params(episode, index):
+    """
+    Turn one job file entry into the params used by render_episode, filling in speaker
+    details the same way the interactive prompts do, but from the episode's seed.
+    Speakers get a voice on every backend as in assign_speaker_voices; unknown voice names raise ValueError.
+    """
+    seed = episode.get("seed", random.randrange(2**32) if config.EPISODE_SEED is None else config.EPISODE_SEED)
+    rng = random.Random(seed)
+    speakers = []
+    for speaker in episode.get("speakers") or [{} for _ in range(episode.get("num_speakers", 2))]:
+        gender = speaker.get("gender") or rng.choice(config.DEFAULT_GENDERS)
+        personality = speaker.get("personality") or rng.choice(list(config.DEFAULT_PERSONALITIES.keys()))
+        voices = assign_speaker_voices(speaker, gender, personality, speakers, rng, episode.get("backends"))
+        speakers.append({
+            "name": speaker.get("name") or rng.choice(config.DEFAULT_NAMES),
+            "gender": gender,
+            "title": speaker.get("title") or rng.choice(config.DEFAULT_TITLES),
+            "personality": personality,
+            "description": speaker.get("description") or config.DEFAULT_PERSONALITIES[personality],
+            "voices": voices
+        })
+    return {
+        "podcast_name": episode["podcast_name"],
+        "topic": episode["topic"],
+        "num_speakers": len(speakers),
+        "length": episode.get("length", "short").lower(),
+        "speakers": speakers,
+        "seed": seed,
+        "output_dir": episode.get("output_dir") or os.path.join("episodes", f"{index:02d}-{slugify(episode['podcast_name'])}")
+    }
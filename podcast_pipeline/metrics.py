@@ -0,0 +1,139 @@
+"""
+Run metrics: stage spans, latency histograms, counters and the run report.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from . import config
+
+metrics_lock = threading.Lock()
+metrics = {"start": time.perf_counter(), "spans": [], "histograms": {}, "counters": {}}
+
+def reset_metrics():
+    """
+    Clear the metrics of the previous run (batch workers render several episodes per process).
+    """
+    with metrics_lock:
+        metrics.update(start=time.perf_counter(), spans=[], histograms={}, counters={
+            "tts_requests": 0, "tts_characters": 0, "tts_failures": 0, "llm_input_tokens": 0, "llm_output_tokens": 0,
+            "llm_cache_read_tokens": 0, "llm_cache_write_tokens": 0, "retries": 0, "throttled": 0, "bytes_written": 0,
+            "tts_failovers": 0, "hedged_requests": 0, "hedge_wins": 0, "research_queries": 0, "research_results": 0,
+            "research_duplicates": 0, "research_tokens": 0
+        })
+
+def count(name, value=1):
+    """
+    Add to a run counter.
+    """
+    with metrics_lock:
+        metrics["counters"][name] = metrics["counters"].get(name, 0) + value
+
+def observe(stage, seconds):
+    """
+    Record one stage duration in that stage's latency histogram.
+    """
+    with metrics_lock:
+        histogram = metrics["histograms"].setdefault(stage, {"buckets": [0] * len(config.METRICS_BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(config.METRICS_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+@contextmanager
+def timed_stage(stage, **labels):
+    """
+    Time a block as a span of the given stage and add it to the stage's histogram.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe(stage, seconds)
+        with metrics_lock:
+            metrics["spans"].append({"stage": stage, **labels, "start": round(start - metrics["start"], 4), "seconds": round(seconds, 4)})
+
+def record_usage(usage):
+    """
+    Count the tokens of an Anthropic response.
+    """
+    count("llm_input_tokens", usage.input_tokens)
+    count("llm_output_tokens", usage.output_tokens)
+    count("llm_cache_read_tokens", getattr(usage, "cache_read_input_tokens", None) or 0)
+    count("llm_cache_write_tokens", getattr(usage, "cache_creation_input_tokens", None) or 0)
+
+def prompt_cache_summary():
+    """
+    Summarize the run's prompt caching: the share of prompt tokens read from the cache and
+    the input tokens saved, counting a cache read at a tenth and a cache write at 1.25x the base price.
+    """
+    with metrics_lock:
+        counters = metrics["counters"]
+        read = counters.get("llm_cache_read_tokens", 0)
+        written = counters.get("llm_cache_write_tokens", 0)
+        uncached = counters.get("llm_input_tokens", 0)
+    total = read + written + uncached
+    return {
+        "prompt_tokens": total,
+        "prompt_cache_read_tokens": read,
+        "prompt_cache_write_tokens": written,
+        "prompt_cache_hit_rate": round(read / total, 3) if total else 0.0,
+        "prompt_tokens_saved": round(read * 0.9 - written * 0.25)
+    }
+
+def format_prometheus_metrics():
+    """
+    Render the run's histograms and counters in the Prometheus text exposition format.
+    """
+    with metrics_lock:
+        histograms = dict(metrics["histograms"])
+        counters = dict(metrics["counters"])
+    lines = [
+        "# HELP podcast_stage_seconds Time spent in each pipeline stage.",
+        "# TYPE podcast_stage_seconds histogram"
+    ]
+    for stage, histogram in sorted(histograms.items()):
+        for bound, bucket in zip(config.METRICS_BUCKETS, histogram["buckets"]):
+            lines.append(f'podcast_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket}')
+        lines.append(f'podcast_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'podcast_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+        lines.append(f'podcast_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE podcast_{name}_total counter")
+        lines.append(f"podcast_{name}_total {value}")
+    return "\n".join(lines) + "\n"
+
+def write_metrics(output_dir, summary):
+    """
+    Write the run's JSON report and Prometheus textfile into output_dir.
+    """
+    with metrics_lock:
+        report = {
+            "summary": summary,
+            "counters": dict(metrics["counters"]),
+            "histograms": {stage: {**histogram, "bounds": list(config.METRICS_BUCKETS)} for stage, histogram in metrics["histograms"].items()},
+            "spans": sorted(metrics["spans"], key=lambda span: span["start"])
+        }
+    with open(os.path.join(output_dir, config.METRICS_REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
+    # Write then rename, so the textfile collector never reads a half-written file
+    textfile = os.path.join(output_dir, config.METRICS_TEXTFILE)
+    with open(f"{textfile}.tmp", "w") as f:
+        f.write(format_prometheus_metrics())
+    os.replace(f"{textfile}.tmp", textfile)
+
+def write_profile(output_dir, profiler, snapshot):
+    """
+    Save the cProfile stats and the largest tracemalloc allocation sites of a --profile run.
+    """
+    import pstats  # Only --profile runs need it
+    profiler.dump_stats(os.path.join(output_dir, "profile.pstats"))
+    with open(os.path.join(output_dir, "profile.txt"), "w") as f:
+        pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(40)
+        f.write("\nTop allocations (tracemalloc):\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            f.write(f"{stat}\n")
@@ -0,0 +1,232 @@
+"""
+Provider clients and sessions, optional dependency loading, rate limits and retries.
+"""
+import random
+import time
+import threading
+import itertools
+import sys
+import importlib
+from email.utils import parsedate_to_datetime
+
+from . import config
+from .metrics import count
+
+client = None  # Anthropic client, created by get_client() on first use
+provider_sessions = {}
+tts_clients = []
+tts_client_counter = itertools.count()
+session_lock = threading.Lock()
+rate_limiters = {}
+rate_limit_lock = threading.Lock()
+retry_budget = threading.local()  # Lets the router lower RETRY_ATTEMPTS for requests that can fail over
+provider_calls = threading.local()  # Requests this thread sent to a provider, so the router can tell them from cache hits
+request_slots = None  # Created by get_request_slots() on first use, so MAX_CONCURRENT_REQUESTS can be set after import
+
+def load_sdk(module, package, purpose="this stage"):
+    """
+    Import a provider SDK or optional dependency the first time a stage needs it,
+    so commands that never touch a provider do not pay for loading its SDK.
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        raise SystemExit(f"{package} is required for {purpose}: pip install {package}")
+
+def get_client():
+    """
+    Return the Anthropic client, creating it on first use.
+    """
+    global client
+    with session_lock:
+        if client is None:
+            client = load_sdk("anthropic", "anthropic", "script generation").Anthropic(api_key=config.ANTHROPIC_API_KEY)
+        return client
+
+def create_http_session(pool_size=None):
+    """
+    Create a requests.Session that keeps up to pool_size (default HTTP_POOL_SIZE) connections alive per host.
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    requests = load_sdk("requests", "requests")
+    session = requests.Session()
+    adapter = load_sdk("requests.adapters", "requests").HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_http_session(provider):
+    """
+    Return the shared session for a provider, so connections are reused across lines and episodes.
+    """
+    with session_lock:
+        if provider not in provider_sessions:
+            provider_sessions[provider] = create_http_session(config.HTTP_POOL_SIZE)
+        return provider_sessions[provider]
+
+def get_tts_client():
+    """
+    Return one of the long-lived Text-to-Speech clients, handing them out round-robin.
+    """
+    texttospeech = load_sdk("google.cloud.texttospeech", "google-cloud-texttospeech", 'the "google" backend')
+    with session_lock:
+        if not tts_clients:
+            tts_clients.extend(texttospeech.TextToSpeechClient() for _ in range(config.TTS_CLIENT_POOL_SIZE))
+        return tts_clients[next(tts_client_counter) % len(tts_clients)]
+
+def acquire_rate_limit(provider, characters=0):
+    """
+    Block until the provider's token buckets allow one more request of the given number of characters.
+    """
+    limits = config.RATE_LIMITS.get(provider, {})
+    max_rate = limits.get("requests_per_second")
+    char_rate = limits.get("characters_per_minute")
+    needed = min(characters, char_rate) if char_rate else 0  # A request larger than the bucket waits for a full one
+    while True:
+        with rate_limit_lock:
+            now = time.monotonic()
+            limiter = rate_limiters.setdefault(provider, {
+                "rate": max_rate, "requests": max_rate or 0, "characters": char_rate or 0, "updated": now, "blocked_until": 0.0
+            })
+            elapsed = now - limiter["updated"]
+            limiter["updated"] = now
+            wait = limiter["blocked_until"] - now
+            if max_rate:
+                limiter["requests"] = min(max(1.0, limiter["rate"]), limiter["requests"] + elapsed * limiter["rate"])
+                if limiter["requests"] < 1:
+                    wait = max(wait, (1 - limiter["requests"]) / limiter["rate"])
+            if char_rate:
+                limiter["characters"] = min(char_rate, limiter["characters"] + elapsed * char_rate / 60)
+                if limiter["characters"] < needed:
+                    wait = max(wait, (needed - limiter["characters"]) * 60 / char_rate)
+            if wait <= 0:
+                if max_rate:
+                    limiter["requests"] -= 1
+                limiter["characters"] -= needed
+                return
+        time.sleep(wait)
+
+def throttle_provider(provider, retry_after=None):
+    """
+    Slow a provider down after a 429: cut its request rate, and pause every thread until Retry-After has passed.
+    """
+    with rate_limit_lock:
+        limiter = rate_limiters[provider]
+        if limiter["rate"]:
+            limiter["rate"] = max(0.1, limiter["rate"] * config.RATE_LIMIT_BACKOFF)
+        if retry_after:
+            limiter["blocked_until"] = max(limiter["blocked_until"], time.monotonic() + retry_after)
+    count("throttled")
+
+def recover_provider(provider):
+    """
+    Win back part of a throttled provider's request rate after a successful request.
+    """
+    max_rate = config.RATE_LIMITS.get(provider, {}).get("requests_per_second")
+    if not max_rate:
+        return
+    with rate_limit_lock:
+        limiter = rate_limiters[provider]
+        limiter["rate"] = min(max_rate, limiter["rate"] + max_rate * config.RATE_LIMIT_RECOVERY)
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def classify_failure(response, error):
+    """
+    Decide whether a provider request should be retried.
+    Returns (retry, throttled, retry_after).
+    """
+    if error is not None:
+        google_exceptions = sys.modules.get("google.api_core.exceptions")  # Only loaded once the "google" backend is used
+        if google_exceptions is not None:
+            if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+                return True, True, None
+            if isinstance(error, (google_exceptions.ServiceUnavailable, google_exceptions.DeadlineExceeded, google_exceptions.InternalServerError)):
+                return True, False, None
+        requests = sys.modules.get("requests")
+        return requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)), False, None
+    if not hasattr(response, "status_code"):
+        return False, False, None  # gRPC calls only fail by raising
+    if response.status_code == 429:
+        return True, True, parse_retry_after(response.headers.get("Retry-After"))
+    if response.status_code in (500, 502, 503, 504):
+        return True, False, parse_retry_after(response.headers.get("Retry-After"))
+    return False, False, None
+
+def get_request_slots():
+    """
+    Return the semaphore that caps provider requests in flight at MAX_CONCURRENT_REQUESTS, creating it on first use.
+    """
+    global request_slots
+    with rate_limit_lock:
+        if request_slots is None:
+            request_slots = threading.BoundedSemaphore(config.MAX_CONCURRENT_REQUESTS)
+        return request_slots
+
+def release_on_close(response, slots):
+    """
+    Keep a streamed response's request slot until the response is closed, so a download whose
+    body is read after send_with_retries returns still counts against MAX_CONCURRENT_REQUESTS.
+    """
+    close = response.close
+    released = []
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if not released:
+                released.append(True)
+                slots.release()
+
+    response.close = close_and_release
+
+def send_with_retries(provider, send, characters=0, stream=False):
+    """
+    Call send() under the provider's rate limit and the global concurrency cap, retrying
+    throttled and transient failures with jittered exponential backoff.
+    Returns the last response, or raises the last error, once retries run out.
+    With stream=True the body is read after this returns, so the response holds its
+    request slot until the caller closes it.
+    """
+    max_attempts = getattr(retry_budget, "attempts", config.RETRY_ATTEMPTS)
+    provider_calls.sent = getattr(provider_calls, "sent", 0) + 1
+    slots = get_request_slots()
+    for attempt in itertools.count():
+        acquire_rate_limit(provider, characters)
+        slots.acquire()
+        try:
+            response, error = send(), None
+        except Exception as e:
+            response, error = None, e
+        retry, throttled, retry_after = classify_failure(response, error)
+        final = not retry or attempt >= max_attempts
+        if final and stream and response is not None:
+            release_on_close(response, slots)
+        else:
+            if not final and response is not None:
+                response.close()  # A retried response is dropped; return its connection to the pool
+            slots.release()
+        if final:
+            if error is not None:
+                raise error
+            if not retry:
+                recover_provider(provider)
+            return response
+        count("retries")
+        if throttled:
+            throttle_provider(provider, retry_after)
+        # Full jitter, so threads that failed together do not retry together
+        time.sleep(retry_after if retry_after and not throttled else random.uniform(0, min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * 2 ** attempt)))
@@ -0,0 +1,184 @@
+"""
+Topic research: Serp API searches, the research cache and compaction of the results.
+"""
+import json
+import sqlite3
+import time
+import threading
+import re
+import math
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .metrics import count, timed_stage
+from .providers import get_http_session, send_with_retries
+
+research_cache_lock = threading.Lock()
+
+def open_research_cache():
+    """
+    Open the research cache database, creating its table on first use.
+    """
+    db = sqlite3.connect(config.RESEARCH_CACHE_FILE)
+    db.execute("CREATE TABLE IF NOT EXISTS research_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, fetched_at REAL NOT NULL)")
+    return db
+
+def research_cache_key(kind, topic, num):
+    """
+    Build a cache key from the normalized query, so "AI  Safety" and "ai safety" share an entry.
+    """
+    normalized_topic = " ".join(topic.lower().split())
+    return f"{kind}:{num}:{normalized_topic}"
+
+def research_cache_get(key):
+    """
+    Return (value, age in seconds) for a cached entry, or (None, None) if there is none.
+    """
+    with research_cache_lock, closing(open_research_cache()) as db:
+        row = db.execute("SELECT value, fetched_at FROM research_cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None, None
+    return row[0], time.time() - row[1]
+
+def research_cache_put(key, value):
+    """
+    Store a cache entry.
+    """
+    with research_cache_lock, closing(open_research_cache()) as db, db:
+        db.execute("INSERT OR REPLACE INTO research_cache (key, value, fetched_at) VALUES (?, ?, ?)", (key, value, time.time()))
+
+def search_serp_api(topic, num=5):
+    """
+    Run a Serp API search and cache the organic results.
+    """
+    params = {
+        "q": topic,
+        "api_key": config.SERP_API_KEY,
+        "num": num  # Number of results to fetch
+    }
+    with timed_stage("serp_request"):
+        response = send_with_retries("serpapi", lambda: get_http_session("serpapi").get(config.SERP_API_URL, params=params))
+    if response.status_code == 200:
+        results = response.json().get("organic_results", [])
+        research_cache_put(research_cache_key("results", topic, num), json.dumps(results))
+        return results
+    else:
+        print(f"Error fetching research data: {response.status_code}")
+        return []
+
+def fetch_research_data(topic, num=5):
+    """
+    Fetch research data using the Serp API, serving recent searches from the local cache.
+    """
+    cached, age = research_cache_get(research_cache_key("results", topic, num))
+    if cached is not None:
+        if age < config.RESEARCH_CACHE_TTL:
+            return json.loads(cached)
+        if age < config.RESEARCH_CACHE_STALE_TTL:
+            # Serve the stale results now and refresh them for the next run
+            threading.Thread(target=search_serp_api, args=(topic, num), daemon=True).start()
+            return json.loads(cached)
+    return search_serp_api(topic, num)
+
+def expand_research_queries(topic):
+    """
+    Expand a topic into the distinct sub-queries of RESEARCH_QUERIES.
+    """
+    queries = []
+    for template in config.RESEARCH_QUERIES:
+        query = template.format(topic=topic.strip())
+        if query.lower() not in (existing.lower() for existing in queries):
+            queries.append(query)
+    return queries
+
+def fetch_research_results(topic, num=None):
+    """
+    Search every sub-query of a topic concurrently and return one result list per query,
+    each in the search engine's order. A failed query contributes an empty list.
+    """
+    num = num or config.RESEARCH_RESULTS_PER_QUERY
+    queries = expand_research_queries(topic)
+    count("research_queries", len(queries))
+    with ThreadPoolExecutor(max_workers=min(config.RESEARCH_MAX_WORKERS, len(queries))) as executor:
+        futures = [executor.submit(fetch_research_data, query, num) for query in queries]
+    result_lists = []
+    for query, future in zip(queries, futures):
+        try:
+            result_lists.append(future.result())
+        except Exception as e:
+            print(f"Error fetching research data for {query!r}: {e}")
+            result_lists.append([])
+    return result_lists
+
+def snippet_shingles(text):
+    """
+    Return the set of lowercase word trigrams of a snippet, for near-duplicate detection.
+    """
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+
+def estimate_tokens(text):
+    """
+    Estimate the prompt tokens of a text from its length.
+    """
+    return math.ceil(len(text) / config.CHARS_PER_TOKEN)
+
+def rank_research_results(result_lists):
+    """
+    Merge the results of several queries into one ranked list without duplicates.
+
+    Results are scored by reciprocal rank fusion, so a source that several sub-queries
+    rank highly comes first. A result with an already seen link, or a snippet nearly
+    identical to a kept one, adds its score to the kept result instead of being listed again.
+    """
+    kept = []
+    duplicates = 0
+    # Visit results rank by rank across queries, so a query's best result is kept over another's tail
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results) or not results[rank].get("snippet"):
+                continue
+            result = results[rank]
+            score = 1 / (config.RESEARCH_RANK_OFFSET + rank + 1)
+            link = result.get("link", "").rstrip("/").lower()
+            shingles = snippet_shingles(result["snippet"])
+            for entry in kept:
+                overlap = len(shingles & entry["shingles"]) / len(shingles | entry["shingles"])
+                if link == entry["link"] or overlap >= config.RESEARCH_DUPLICATE_SIMILARITY:
+                    entry["score"] += score
+                    duplicates += 1
+                    break
+            else:
+                kept.append({"result": result, "link": link, "shingles": shingles, "score": score})
+    count("research_duplicates", duplicates)
+    return [entry["result"] for entry in sorted(kept, key=lambda entry: -entry["score"])]
+
+def format_research_text(research_data, token_budget=None):
+    """
+    Format search results as the research block of the script prompt, in order, leaving
+    out any result that would take the block past token_budget.
+    """
+    entries = []
+    tokens = 0
+    for result in research_data:
+        entry = f"Source: {result['link']}\nSummary: {result['snippet']}"
+        entry_tokens = estimate_tokens(entry) + 1
+        if token_budget is not None and tokens + entry_tokens > token_budget:
+            continue
+        entries.append(entry)
+        tokens += entry_tokens
+    return "\n".join(entries)
+
+def get_research_text(topic, num=None):
+    """
+    Return the research block for a topic: the deduplicated, ranked results of all its
+    sub-queries, trimmed to RESEARCH_TOKEN_BUDGET. Each sub-query is served from the
+    research cache when it is recent, so only the cheap compaction runs again.
+    """
+    result_lists = fetch_research_results(topic, num)
+    ranked = rank_research_results(result_lists)
+    research_text = format_research_text(ranked, config.RESEARCH_TOKEN_BUDGET)
+    count("research_results", sum(len(results) for results in result_lists))
+    count("research_tokens", estimate_tokens(research_text))
+    return research_text
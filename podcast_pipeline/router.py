@@ -0,0 +1,216 @@
+"""
+Backend routing: ranking by latency and errors, failover and hedged requests.
+"""
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+from . import config
+from .metrics import count, metrics, metrics_lock, observe
+from .providers import provider_calls, retry_budget, session_lock
+from .backends import tts_backends
+from .duration import record_line_duration
+
+backend_stats = {}
+backend_stats_lock = threading.Lock()
+hedge_executor = None
+
+def backend_summary():
+    """
+    Summarize which backends rendered the run's lines, and how often the router failed over or hedged.
+    """
+    with metrics_lock:
+        counters = dict(metrics["counters"])
+    return {
+        "backend_lines": {backend: counters[f"tts_lines_{backend}"] for backend in tts_backends if counters.get(f"tts_lines_{backend}")},
+        "tts_failovers": counters.get("tts_failovers", 0),
+        "hedged_requests": counters.get("hedged_requests", 0),
+        "hedge_wins": counters.get("hedge_wins", 0)
+    }
+
+def record_backend_result(backend, seconds, failed=False):
+    """
+    Fold one request into a backend's moving latency and error rate averages.
+    """
+    with backend_stats_lock:
+        stats = backend_stats.setdefault(backend, {"latency": None, "error_rate": 0.0, "latencies": deque(maxlen=config.ROUTER_WINDOW)})
+        stats["error_rate"] += config.ROUTER_EWMA_ALPHA * (float(failed) - stats["error_rate"])
+        if not failed:
+            stats["latencies"].append(seconds)
+        # A failure counts at the latency it took to fail, so a backend that errors fast still ranks poorly
+        stats["latency"] = seconds if stats["latency"] is None else stats["latency"] + config.ROUTER_EWMA_ALPHA * (seconds - stats["latency"])
+    observe(f"tts_{backend}", seconds)
+
+def backend_score(backend):
+    """
+    Return a backend's expected seconds per line, penalized by its error rate; None until it has been tried.
+    """
+    with backend_stats_lock:
+        stats = backend_stats.get(backend)
+        if not stats or stats["latency"] is None:
+            return None
+        return stats["latency"] * (1 + config.ROUTER_ERROR_PENALTY * stats["error_rate"])
+
+def rank_backends(backends):
+    """
+    Order a line's candidate backends for routing and failover. The first (preferred) backend
+    keeps the line unless another scores ROUTER_SWITCH_MARGIN times better; the rest follow by score.
+    A backend not tried yet scores as the preferred one, so it is reached by failover or hedging, never switched to.
+    """
+    scores = {backend: backend_score(backend) for backend in backends}
+    preferred = backends[0]
+    untried = scores[preferred] or 0.0
+    scores = {backend: untried if score is None else score for backend, score in scores.items()}
+    best = min(backends, key=scores.get)
+    first = best if scores[best] * config.ROUTER_SWITCH_MARGIN < scores[preferred] else preferred
+    return [first] + sorted((backend for backend in backends if backend != first), key=scores.get)
+
+def hedge_threshold(backend):
+    """
+    Return how long a backend's request may run before it is hedged, or None if it is not hedged.
+    """
+    if not config.HEDGE_REQUESTS:
+        return None
+    with backend_stats_lock:
+        latencies = sorted(backend_stats.get(backend, {}).get("latencies", ()))
+    if len(latencies) < config.HEDGE_MIN_SAMPLES:
+        return None
+    return latencies[min(len(latencies) - 1, int(len(latencies) * config.HEDGE_PERCENTILE))]
+
+def get_hedge_executor():
+    """
+    Return the thread pool that hedged requests run in, so the line's own thread can wait on both.
+    """
+    global hedge_executor
+    with session_lock:
+        if hedge_executor is None:
+            hedge_executor = ThreadPoolExecutor(max_workers=4 * config.TTS_MAX_WORKERS)
+        return hedge_executor
+
+def write_part_file(backend, text, voice, part_file):
+    """
+    Write a line's audio to part_file, chunk by chunk as it downloads if the backend can
+    stream, deleting the partial file if synthesis fails.
+    """
+    stream = tts_backends[backend]["stream"] if config.STREAM_TTS_AUDIO else None
+    chunks = stream(text, voice) if stream else [tts_backends[backend]["synthesize"](text, voice)]
+    try:
+        with open(part_file, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+    except BaseException:
+        if stream:
+            chunks.close()  # Drop the download (and its cache entry) if the line file could not be written
+        remove_part_file(part_file)
+        raise
+    return part_file
+
+def remove_part_file(part_file):
+    """
+    Delete a part file, if it still exists.
+    """
+    try:
+        os.remove(part_file)
+    except FileNotFoundError:
+        pass
+
+def call_backend(backend, text, voice, retries=None, output_file=None):
+    """
+    Synthesize text on one backend, recording the request in the router's statistics.
+    A line served from the audio cache sent no request and is left out of them, so cache
+    hits never pull a backend's latency (and hedge threshold) towards zero. Lines that did
+    reach the provider are also measured for the duration model.
+    retries overrides RETRY_ATTEMPTS for the provider requests this makes.
+    Returns the audio, or with output_file, the part file next to it that holds the audio.
+    """
+    start = time.perf_counter()
+    retry_budget.attempts = config.RETRY_ATTEMPTS if retries is None else retries
+    provider_calls.sent = 0
+    try:
+        if output_file is None:
+            audio = tts_backends[backend]["synthesize"](text, voice)
+        else:
+            # One part file per request, so a hedged duplicate never writes into the same file
+            audio = write_part_file(backend, text, voice, f"{output_file}.{backend}.{threading.get_ident()}.part")
+    except Exception:
+        record_backend_result(backend, time.perf_counter() - start, failed=True)
+        raise
+    finally:
+        del retry_budget.attempts
+    if provider_calls.sent:
+        record_backend_result(backend, time.perf_counter() - start)
+        # Only fresh audio is measured: counting cached clips again would let often re-rendered lines dominate a voice's rate
+        if config.DURATION_CHECK and output_file is None:
+            record_line_duration(backend, voice, text, audio=audio)
+        elif config.DURATION_CHECK:
+            record_line_duration(backend, voice, text, audio_file=audio)
+    return audio
+
+def call_hedged(backend, hedge_backend, text, voices, retries=None, output_file=None):
+    """
+    Synthesize text on backend, sending a duplicate to hedge_backend if the request runs past the
+    backend's hedge threshold. Returns (audio, backend) of whichever succeeds first.
+    """
+    threshold = hedge_threshold(backend)
+    if threshold is None:
+        return call_backend(backend, text, voices[backend], retries, output_file), backend
+    executor = get_hedge_executor()
+    primary = executor.submit(call_backend, backend, text, voices[backend], retries, output_file)
+    if wait([primary], timeout=threshold).done:
+        return primary.result(), backend
+    count("hedged_requests")
+    hedge = executor.submit(call_backend, hedge_backend, text, voices[hedge_backend], retries, output_file)
+    futures = {primary: backend, hedge: hedge_backend}
+
+    def discard_part_file(future):
+        if future.exception() is None:
+            remove_part_file(future.result())
+
+    for future in as_completed(futures):
+        if future.exception() is None:
+            if future is hedge:
+                count("hedge_wins")
+            if output_file is not None:
+                # The slower request finishes in the background; its copy of the line is not needed
+                slower = hedge if future is primary else primary
+                slower.add_done_callback(discard_part_file)
+            return future.result(), futures[future]
+    return primary.result(), backend  # Both failed: raise the original request's error
+
+def synthesize_speech(text, voices, backends=None, output_file=None):
+    """
+    Synthesize a line on the best of the speaker's backends (optionally limited to backends),
+    failing over to the next backend on errors. Returns (audio, backend); with output_file,
+    the audio is written to a part file next to it and (part file, backend) is returned.
+    """
+    candidates = [backend for backend in voices if backend in tts_backends and (backends is None or backend in backends)]
+    if not candidates:
+        raise RuntimeError(f"No voice for any of the backends {', '.join(backends or tts_backends)}")
+    order = rank_backends(candidates)
+    for i, backend in enumerate(order):
+        # Hedge on the next backend in line, or with a second request to the same one
+        hedge_backend = order[i + 1] if i + 1 < len(order) else backend
+        retries = config.FAILOVER_RETRY_ATTEMPTS if i + 1 < len(order) else None
+        try:
+            audio, used = call_hedged(backend, hedge_backend, text, voices, retries, output_file)
+            count(f"tts_lines_{used}")
+            return audio, used
+        except Exception as e:
+            if i + 1 == len(order):
+                raise
+            print(f"{tts_backends[backend]['label']} failed ({e}); failing over to {tts_backends[order[i + 1]]['label']}.")
+            count("tts_failovers")
+
+def generate_speech(text, output_file, voices, backends=None):
+    """
+    Synthesize a line and save it to output_file, returning the backend that rendered it.
+    """
+    part_file, backend = synthesize_speech(text, voices, backends, output_file)
+
+    # Readers of output_file never see a partially downloaded line
+    os.replace(part_file, output_file)
+    count("bytes_written", os.path.getsize(output_file))
+    print(f"Audio file saved as {output_file}")
+    return backend
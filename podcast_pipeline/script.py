@@ -0,0 +1,349 @@
+"""
+Script writing with Claude: prompts, streamed and sectioned generation, and length fitting.
+"""
+import textwrap
+from datetime import datetime
+import time
+import itertools
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .metrics import observe, record_usage, timed_stage
+from .providers import get_client
+from .text import normalize_speaker_name
+from .episode import determine_length_details
+from .duration import count_words, load_duration_model, predict_episode_seconds
+from .synthesis import prepare_lines
+
+def build_system_prompt(params, research_data):
+    """
+    Build the system prompt as two blocks: a show prefix (guidelines, show identity and
+    speaker personas) that is identical for every episode of the show, and an episode
+    brief (topic, length and research). With PROMPT_CACHING both are cached, so later
+    episodes reuse the prefix and a sectioned script's outline and sections share the brief.
+    """
+    length_details = determine_length_details(params["length"])
+    host = params['speakers'][0]['name']
+
+    show_prompt = textwrap.dedent(f"""
+    You are a professional podcast script writer for the show "{params['podcast_name']}". Each episode is a detailed, engaging, and natural-sounding podcast conversation about the topic given in the episode brief below.
+    The focus of the discussion must be on the episode topic, not on the show itself.
+    Conduct deep research and include rare, granular facts and statistics in the speakers' responses.
+    Use the research data in the episode brief to inform the discussion and cite sources when necessary.
+    
+    Follow these strict guidelines:
+    
+    1. Ensure {params['num_speakers']} speakers contribute equally throughout the discussion.
+    2. Structure exactly the number of rounds of rebuttals given in the episode brief, where speakers actively engage and challenge each other’s points.
+    3. The conversation must be structured so that each speaker takes turns contributing to every section, avoiding any speaker being omitted or underrepresented.
+    4. Start with {host} giving an AI disclaimer and introducing the topic.
+    5. {host} provides an insightful, data-backed summary of the topic before introducing the guests.
+    6. Maintain a free-flowing discussion with varied tones, engagement styles, and interactive moments (interruptions, humor, and rhetorical questions where natural).
+    7. Each speaker must reflect their assigned personality in their **vocabulary, sentence structure, and speaking rhythm** (e.g., an 'Expert' uses precise, technical language; a 'Storyteller' speaks in immersive, flowing narratives).
+    8. Avoid robotic, scripted-sounding responses by ensuring natural-sounding phrasing, contractions, and dynamic interactions.
+    9. Disagreements should take different forms, including:
+         - **Factual disputes**: Challenge statistics or data interpretation.
+         - **Value conflicts**: Differ on priorities or ethical considerations.
+         - **Methodological critiques**: Question research approaches.
+         - **Predictive disagreements**: Contrast future projections.
+         - **Solution debates**: Propose competing approaches.
+    10. Structure rebuttals to directly counter previous arguments rather than generic disagreements.
+    11. Ensure citations are **naturally integrated into speech** (e.g., 'According to a 2023 study published in Nature...' rather than 'Source: [link]').
+    12. Avoid repetitive or placeholder responses. Every reply must be **substantive, engaging, and factually grounded.**
+    13. Ensure the conversation feels **like a real podcast, not a monologue or rigidly structured Q&A session.**
+    14. Conclude with {host} summarizing key takeaways and prompting listeners to subscribe.
+
+    
+    Speaker Details:
+    """)
+
+    for speaker in params["speakers"]:
+        show_prompt += textwrap.dedent(f"""
+        {speaker['name']} ({speaker['title']}): {speaker['description']}
+        """)
+
+    episode_prompt = textwrap.dedent(f"""
+    Episode brief:
+    Topic: {params['topic']}
+    Rounds of rebuttals: {length_details['rebuttals']}
+    Research data:
+    """) + f"\n{research_data}\n"
+
+    blocks = [{"type": "text", "text": show_prompt}, {"type": "text", "text": episode_prompt}]
+    if config.PROMPT_CACHING:
+        for block in blocks:
+            block["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+def build_user_prompt(params):
+    """
+    Build the user message asking for the episode script.
+    """
+    length_details = determine_length_details(params["length"])
+    current_date = datetime.now().strftime("%B %d, %Y")
+    return f"Generate a detailed podcast script for {params['podcast_name']} recorded on {current_date}. The focus of the discussion must be on {params['topic']}. Ensure the conversation lasts approximately {length_details['duration']} minutes and includes exactly {length_details['rebuttals']} rounds of rebuttals. Avoid repetition and placeholder text. Ensure meaningful engagement among speakers, and reflect their assigned personality in the way they speak. Include rare and granular facts and statistics in responses. Do not format speaker names in brackets or use 'Speaker 1'—use their assigned names naturally. Keep the conversation flowing without artificial separators or brackets between rounds. Ensure that all {params['num_speakers']} speakers take turns in a structured dialogue, with no one omitted."
+
+def generate_podcast_script(params, research_data):
+    with timed_stage("script"):
+        response = get_client().messages.create(
+            model=config.SCRIPT_MODEL,
+            max_tokens=4000,
+            temperature=0.7,
+            system=build_system_prompt(params, research_data),
+            messages=[
+                {
+                    "role": "user",
+                    "content": build_user_prompt(params)
+                }
+            ]
+        )
+    record_usage(response.usage)
+
+    return response.content[0].text
+
+def stream_podcast_script(params, research_data, partial_script=None):
+    """
+    Stream the podcast script from Claude, yielding text as it is generated.
+    With partial_script (the lines an interrupted run saved), Claude continues it
+    from where it stopped and only the rest of the script is yielded.
+    """
+    messages = [
+        {
+            "role": "user",
+            "content": build_user_prompt(params)
+        }
+    ]
+    if partial_script:
+        messages.append({"role": "assistant", "content": partial_script.rstrip()})
+    with get_client().messages.stream(
+        model=config.SCRIPT_MODEL,
+        max_tokens=4000,
+        temperature=0.7,
+        system=build_system_prompt(params, research_data),
+        messages=messages
+    ) as stream, timed_stage("script"):
+        start = time.perf_counter()
+        for i, text in enumerate(stream.text_stream):
+            if i == 0:
+                observe("script_first_token", time.perf_counter() - start)
+            yield text
+        record_usage(stream.get_final_message().usage)
+
+def script_sections(params):
+    """
+    Name the sections of a sectioned script: the intro, each rebuttal round and the conclusion.
+    """
+    rounds = determine_length_details(params["length"])["rebuttals"]
+    return ["Intro"] + [f"Round {i}" for i in range(1, rounds + 1)] + ["Conclusion"]
+
+def generate_outline(params, research_data, sections):
+    """
+    Ask Claude for a compact outline with one line per section, returned as {section: summary}.
+    """
+    user_prompt = textwrap.dedent(f"""
+    Before the script is written, plan it. Write a compact outline of the episode with exactly one line per section,
+    in this order: {', '.join(sections)}. Start each line with the section name and a colon (e.g. "Round 1: ...").
+    For each section give its sub-topic, the facts or statistics it should use, the kind of disagreement,
+    and which speakers lead it. Do not write any dialogue.
+    """)
+    with timed_stage("outline"):
+        response = get_client().messages.create(
+            model=config.SCRIPT_MODEL,
+            max_tokens=1000,
+            temperature=0.7,
+            system=build_system_prompt(params, research_data),
+            messages=[{"role": "user", "content": user_prompt}]
+        )
+    record_usage(response.usage)
+    outline = {}
+    for line in response.content[0].text.split("\n"):
+        match = re.match(r"^\W*(Intro|Round \d+|Conclusion)\W*:\s*(.+)", line.strip(), re.IGNORECASE)
+        if match:
+            outline[match.group(1).title()] = match.group(2).strip()
+    return outline
+
+def build_section_prompt(params, sections, outline, index):
+    """
+    Build the user message for one section, giving it the whole outline and where it sits in it.
+    """
+    section = sections[index]
+    minutes = determine_length_details(params["length"])["duration"] / len(sections)
+    outline_text = "\n".join(f"{name}: {outline.get(name, '(not planned)')}" for name in sections)
+    if section == "Intro":
+        role = "This is the opening: the AI disclaimer, the data-backed summary of the topic and the guest introductions. Do not start the debate yet and do not wrap up."
+    elif section == "Conclusion":
+        role = "This is the ending: the key takeaways and the prompt to subscribe. Do not greet the listeners or introduce anyone again."
+    else:
+        role = "This is the middle of the conversation: do not greet the listeners, introduce the guests, summarize the episode or say goodbye."
+    previous = f"The previous section covered: {outline.get(sections[index - 1], '')}" if index > 0 else ""
+    following = f"The next section will cover: {outline.get(sections[index + 1], '')}" if index + 1 < len(sections) else ""
+    return textwrap.dedent(f"""
+    The episode is being written in sections that are generated separately and joined afterwards. This is its outline:
+
+    {outline_text}
+
+    Write only the "{section}" section, about {minutes:.0f} minutes of dialogue, following the outline for it.
+    {role}
+    {previous}
+    {following}
+    Write every line as "Name: text" using the speakers' names, with no headings, stage directions or separators.
+    """)
+
+def generate_section(params, research_data, sections, outline, index):
+    """
+    Generate one section of the script and return its lines, dropping a last line cut off by max_tokens.
+    """
+    with timed_stage("section", section=sections[index]):
+        response = get_client().messages.create(
+            model=config.SCRIPT_MODEL,
+            max_tokens=config.SECTION_MAX_TOKENS,
+            temperature=0.7,
+            system=build_system_prompt(params, research_data),
+            messages=[{"role": "user", "content": build_section_prompt(params, sections, outline, index)}]
+        )
+    record_usage(response.usage)
+    lines = [line.strip() for line in response.content[0].text.split("\n") if line.strip()]
+    if response.stop_reason == "max_tokens" and lines:
+        print(f"Section {sections[index]} hit max_tokens; dropping its unfinished last line.")
+        lines.pop()
+    return lines
+
+def stitch_section(lines, speakers, script):
+    """
+    Append a section's lines to the script with continuity checks: drop lines that are not
+    spoken by a known speaker (headings, stage directions) or that repeat an earlier line,
+    and merge a turn that continues the previous speaker's, including across the seam.
+    Returns the number of lines kept.
+    """
+    names = {speaker["name"].upper() for speaker in speakers}
+    seen = set(script)
+    kept = 0
+    for line in lines:
+        speaker, _, text = line.partition(":")
+        if not text.strip() or normalize_speaker_name(speaker).upper() not in names or line in seen:
+            continue
+        seen.add(line)
+        kept += 1
+        if script and normalize_speaker_name(script[-1].split(":")[0]) == normalize_speaker_name(speaker):
+            script[-1] = f"{script[-1]} {text.strip()}"
+        else:
+            script.append(line)
+    return kept
+
+def generate_sectioned_script(params, research_data):
+    """
+    Write the script as an outline plus concurrently generated sections, yielding its lines.
+
+    Sections are requested in parallel, so generation takes about as long as the slowest
+    section; each section's lines are released in order as soon as it and every earlier
+    section are done, so text-to-speech can start on the intro while the rest is written.
+    """
+    sections = script_sections(params)
+    outline = generate_outline(params, research_data, sections)
+    missing = [section for section in sections if section not in outline]
+    if missing:
+        print(f"Outline is missing {', '.join(missing)}; those sections follow the overall brief.")
+    script = []
+    released = 0
+    with ThreadPoolExecutor(max_workers=config.SECTION_MAX_WORKERS) as executor:
+        futures = [executor.submit(generate_section, params, research_data, sections, outline, i) for i in range(len(sections))]
+        for section, future in zip(sections, futures):
+            if not stitch_section(future.result(), params["speakers"], script):
+                print(f"Section {section} produced no usable lines.")
+            # The last line may still be merged with the next section's first line, so hold it back
+            yield from script[released:-1]
+            released = max(released, len(script) - 1)
+    yield from script[released:]
+
+def iter_script_lines(chunks):
+    """
+    Reassemble streamed text chunks into complete script lines, yielding each line as soon as it ends.
+    """
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        yield from lines
+    if buffer:
+        yield buffer
+
+def revise_script(params, research_data, prompt, max_tokens):
+    """
+    Send one script revision request (sharing the cached system prompt) and return the reply text.
+    """
+    with timed_stage("script_revision"):
+        response = get_client().messages.create(
+            model=config.SCRIPT_MODEL,
+            max_tokens=max_tokens,
+            temperature=0.7,
+            system=build_system_prompt(params, research_data),
+            messages=[{"role": "user", "content": prompt}]
+        )
+    record_usage(response.usage)
+    return response.content[0].text
+
+def trim_script(params, research_data, lines, words):
+    """
+    Ask Claude which whole lines to cut to shorten the script by about `words` words, and cut them.
+    The opening line and the closing DURATION_OUTRO_LINES lines are always kept.
+    """
+    numbered = "\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+    reply = revise_script(params, research_data, (
+        f"This podcast script is too long for the episode. Choose whole lines to cut, totalling about {words} words, "
+        f"so that the conversation still flows naturally and every speaker keeps contributing. "
+        f"Reply with only the numbers of the lines to cut, separated by commas.\n\n{numbered}"
+    ), 500)
+    keep_from, keep_to = 2, len(lines) - config.DURATION_OUTRO_LINES
+    # Only a bare list such as "5, 7, 12" is acted on; numbers inside any other text ("about 40 words") are not line numbers
+    if not re.fullmatch(r"\d+(?:\s*,\s*\d+)*\.?", reply.strip()):
+        print(f"Could not read the lines to cut from Claude's reply ({reply.strip()[:80]!r}); keeping the script as it is.")
+        return lines
+    cut = {int(number) for number in re.findall(r"\d+", reply) if keep_from <= int(number) <= keep_to}
+    print(f"Cutting {len(cut)} line(s) to shorten the script.")
+    return [line for i, line in enumerate(lines, 1) if i not in cut]
+
+def extend_script(params, research_data, lines, words):
+    """
+    Ask Claude for about `words` words of further discussion and insert it before the closing lines.
+    """
+    split = max(1, len(lines) - config.DURATION_OUTRO_LINES)
+    reply = revise_script(params, research_data, (
+        f"This podcast script is too short for the episode. Write about {words} words of further discussion that continues "
+        f"naturally from the script so far, in the same \"Name: text\" format, to be inserted before its closing lines. "
+        f"Do not repeat points already made and do not wrap up the episode. Reply with only the new lines.\n\n"
+        f"Script so far:\n{chr(10).join(lines[:split])}\n\nClosing lines:\n{chr(10).join(lines[split:])}"
+    ), min(4000, 2 * words + 200))
+    names = {speaker["name"].upper() for speaker in params["speakers"]}
+    added = [line.strip() for line in reply.split("\n") if ":" in line and normalize_speaker_name(line.split(":")[0].strip()).upper() in names]
+    print(f"Adding {len(added)} line(s) to lengthen the script.")
+    return lines[:split] + added + lines[split:]
+
+def fit_script_duration(params, research_data, script):
+    """
+    Predict how long a script will run and, if it misses its target length by more than
+    DURATION_TOLERANCE, cut or extend it (DURATION_CHECK = "adjust") or refuse it ("reject").
+    Returns the script to synthesize.
+    """
+    target = determine_length_details(params["length"])["duration"] * 60
+    model = load_duration_model()
+    lines = [line for line in script.split("\n") if line.strip()]
+    for revision in itertools.count():
+        jobs = list(prepare_lines(lines, params["speakers"], to_files=False, seed=params["seed"]))
+        predicted = predict_episode_seconds(jobs, model)
+        print(f"Predicted length: {predicted / 60:.1f} minutes (target {target / 60:g})")
+        if abs(predicted / target - 1) <= config.DURATION_TOLERANCE:
+            break
+        if config.DURATION_CHECK == "reject":
+            raise RuntimeError(f"Script is predicted to run {predicted / 60:.1f} minutes, more than {config.DURATION_TOLERANCE:.0%} off the {target / 60:g}-minute target")
+        if revision == config.DURATION_MAX_REVISIONS:
+            print(f"Still off target after {revision} revision(s); synthesizing the script as it is.")
+            break
+        # Claude counts the words it writes, before numbers are spelled out and fillers added
+        words_per_second = sum(count_words(line.split(":", 1)[-1]) for line in lines) / max(predicted, 1)
+        words = max(1, round(abs(target - predicted) * words_per_second))
+        if predicted > target:
+            lines = trim_script(params, research_data, lines, words)
+        else:
+            lines = extend_script(params, research_data, lines, words)
+    return "\n".join(lines)
@@ -0,0 +1,405 @@
+"""
+Pipeline stages and the runs that chain them.
+"""
+import random
+from datetime import datetime
+import os
+import time
+import cProfile
+import tracemalloc
+import threading
+import queue
+import difflib
+
+from . import config
+from .metrics import count, metrics, prompt_cache_summary, reset_metrics, timed_stage, write_metrics, write_profile
+from .research import get_research_text
+from .audio import audio_cache_stats, audio_duration
+from .backends import tts_backends
+from .text import convert_numbers_to_words
+from .episode import determine_length_details, get_user_input, slugify
+from .duration import episode_seconds, load_duration_model, predict_lines
+from .router import backend_summary
+from .synthesis import prepare_lines, synthesize_lines
+from .script import fit_script_duration, generate_podcast_script, generate_sectioned_script, iter_script_lines, stream_podcast_script
+from .assembly import assemble_pcm, combine_audio_files, load_numpy, pipe_audio_to_ffmpeg, result_audio, successful_results, write_progressive_output
+from .checkpoint import load_manifest, manifest_lock, mark_completed_lines, record_line, reusable_record, save_manifest, unused_line_file
+from .work_queue import publish_episode
+
+def duration_summary(params, predicted, output_file=None):
+    """
+    Compare an episode's target length with its predicted and, once output_file exists, its actual length.
+    """
+    target = determine_length_details(params["length"])["duration"] * 60
+    predicted_seconds = episode_seconds(predicted)
+    actual_seconds = None
+    if output_file and os.path.exists(output_file):
+        with open(output_file, "rb") as f:
+            actual_seconds = audio_duration(f)
+    actual = f"{actual_seconds / 60:.1f}" if actual_seconds else "unknown"
+    print(f"Length: target {target / 60:g} minutes, predicted {predicted_seconds / 60:.1f}, actual {actual}")
+    return {
+        "target_seconds": target,
+        "predicted_seconds": round(predicted_seconds, 1),
+        "actual_seconds": round(actual_seconds, 1) if actual_seconds else None
+    }
+
+def start_run(params, output_dir, resume=False):
+    """
+    Load output_dir's checkpoint manifest when resuming, or start a new one for params.
+    Returns the run's (params, manifest).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir) if resume else None
+    if manifest is None:
+        if resume and not params:
+            raise SystemExit(f"No run to resume in {output_dir} (it has no manifest.json)")
+        # Seed the speech patterns so re-renders of this episode produce identical (cacheable) audio
+        params.setdefault("seed", random.randrange(2**32) if config.EPISODE_SEED is None else config.EPISODE_SEED)
+        manifest = {"params": params, "research_text": None, "script": None, "script_complete": False, "lines": {}, "assembled": False}
+        save_manifest(output_dir, manifest)
+    else:
+        params = manifest["params"]
+        print(f"Resuming run in {output_dir}")
+    print(f"Episode seed: {params['seed']}")
+    return params, manifest
+
+def research_stage(params, manifest, output_dir):
+    """
+    Return the run's research text, fetching and checkpointing it unless an earlier attempt did.
+    """
+    if manifest["research_text"] is None:
+        print("\nFetching research data...")
+        with timed_stage("research"):
+            manifest["research_text"] = get_research_text(params["topic"])
+        save_manifest(output_dir, manifest)
+        counters = metrics["counters"]
+        print(f"Research: {counters['research_results']} results from {counters['research_queries']} queries, "
+              f"{counters['research_duplicates']} duplicates merged, about {counters['research_tokens']} tokens kept")
+    return manifest["research_text"]
+
+def checkpoint_script_lines(lines, manifest, output_dir, saved_lines=()):
+    """
+    Yield the saved lines, then the new ones, while a background thread reads the new lines
+    from Claude and checkpoints the script after each one. Text-to-speech pulls lines at its
+    own pace, so the script is saved as fast as Claude writes it, not as fast as it is spoken.
+    manifest["script_complete"] is set once the last line is saved.
+    """
+    script_lines = list(saved_lines)
+    arrived = queue.Queue()
+    finished = object()
+
+    def read_lines():
+        try:
+            for line in lines:
+                with manifest_lock:
+                    script_lines.append(line)
+                    manifest["script"] = "\n".join(script_lines)
+                save_manifest(output_dir, manifest)
+                arrived.put(line)
+            manifest["script_complete"] = True
+            save_manifest(output_dir, manifest)
+            arrived.put(finished)
+        except BaseException as e:
+            arrived.put(e)
+
+    threading.Thread(target=read_lines, daemon=True).start()
+    yield from saved_lines
+    while True:
+        line = arrived.get()
+        if line is finished:
+            return
+        if isinstance(line, BaseException):
+            raise line
+        yield line
+
+def script_stage(params, manifest, output_dir, research_text):
+    """
+    Return the run's script lines, and whether they are already normalized. Lines of a new
+    script are yielded while Claude writes it (sectioned or streamed), and the script is
+    checkpointed as each line arrives; a script an interrupted run left unfinished is
+    continued from its last saved line. With DURATION_CHECK = "adjust" or "reject" the
+    whole script is written and fitted to its target length first.
+    """
+    print("\nGenerating podcast script...")
+    print("\n" + "="*50)
+    print(f"{params['podcast_name'].upper()} PODCAST")
+    print(f"Topic: {params['topic']}")
+    print("="*50 + "\n")
+
+    def echo_lines(lines):
+        for line in lines:
+            print(line)
+            yield line
+
+    # Manifests written before partial scripts were saved only hold finished ones
+    if manifest["script"] is not None and manifest.get("script_complete", True):
+        print(manifest["script"])
+        script_lines = None
+    elif manifest["script"] is not None:
+        # Keep the lines Claude already wrote (and any audio rendered from them) and ask for the rest
+        print(manifest["script"])
+        continuation = iter_script_lines(stream_podcast_script(params, research_text, manifest["script"]))
+        script_lines = checkpoint_script_lines(echo_lines(continuation), manifest, output_dir, manifest["script"].split("\n"))
+    elif params["length"] in config.SECTIONED_SCRIPT_LENGTHS:
+        # Write the sections concurrently and feed each to text-to-speech once it and the ones before it are done
+        script_lines = checkpoint_script_lines(echo_lines(generate_sectioned_script(params, research_text)), manifest, output_dir)
+    elif config.STREAM_SCRIPT:
+        # Feed each line to text-to-speech while Claude is still writing the rest
+        script_lines = checkpoint_script_lines(echo_lines(iter_script_lines(stream_podcast_script(params, research_text))), manifest, output_dir)
+    else:
+        manifest.update(script=generate_podcast_script(params, research_text), script_complete=True)
+        save_manifest(output_dir, manifest)
+        print(manifest["script"])
+        script_lines = None
+
+    if config.DURATION_CHECK in ("adjust", "reject") and not manifest.get("duration_checked"):
+        for line in script_lines or ():
+            pass  # Let the checkpoint record the whole script
+        manifest["script"] = fit_script_duration(params, research_text, manifest["script"])
+        manifest["duration_checked"] = True
+        save_manifest(output_dir, manifest)
+    elif script_lines is not None:
+        return script_lines, False
+    # Normalize the whole script in one pass instead of line by line
+    with timed_stage("normalize"):
+        return convert_numbers_to_words(manifest["script"]).split("\n"), True
+
+def render_episode(params, output_dir=".", resume=False, profile=False, enqueue=False):
+    """
+    Research, script, synthesize and assemble one episode into output_dir, returning a summary.
+
+    With CHECKPOINT_RUNS, output_dir doubles as a run directory: a manifest records
+    each finished stage and line, and resume=True skips everything already done.
+    Stage timings and counters are written to METRICS_REPORT_FILE and METRICS_TEXTFILE
+    in output_dir; profile=True also saves cProfile and tracemalloc output there.
+    With enqueue=True the lines are published to the work queue for --worker processes
+    to synthesize and assemble, instead of being synthesized here.
+    """
+    reset_metrics()
+    if profile:
+        # Only the calling thread is profiled: research, whole-script normalization and assembly (streamed lines are
+        # normalized in synthesize_lines' feeder thread)
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+    params, manifest = start_run(params, output_dir, resume)
+
+    output_file = os.path.join(output_dir, f"podcast.{config.PCM_OUTPUT_FORMAT if config.ASSEMBLY_MODE == 'pcm' else 'mp3'}")
+    if config.ASSEMBLY_MODE == "pcm":
+        load_numpy()
+    hits_before, misses_before = audio_cache_stats["hits"], audio_cache_stats["misses"]
+    start_time = time.time()
+
+    research_text = research_stage(params, manifest, output_dir)
+    script_lines, normalized = script_stage(params, manifest, output_dir, research_text)
+
+    # Convert script to audio
+    print("\nConverting script to audio...")
+    to_files = config.ASSEMBLY_MODE == "files" or config.CHECKPOINT_RUNS or enqueue
+    lines_dir = os.path.join(output_dir, "lines") if config.CHECKPOINT_RUNS else output_dir
+    os.makedirs(lines_dir, exist_ok=True)
+    jobs = prepare_lines(script_lines, params["speakers"], to_files, normalized, params["seed"], lines_dir)
+    if config.DURATION_CHECK:
+        duration_model = load_duration_model()
+        predicted_lines = []
+        jobs = predict_lines(jobs, duration_model, predicted_lines)
+    failed_lines = []
+    audio_files = []
+    queued_lines = None
+    if enqueue:
+        queued_lines = publish_episode(jobs, output_dir, output_file)
+    else:
+        jobs = mark_completed_lines(jobs, manifest)
+        results = synthesize_lines(jobs, on_complete=lambda job, error: record_line(output_dir, manifest, job, error))
+
+    # Combine the audio into a single podcast
+    if enqueue:
+        print(f"Queued {queued_lines} lines in {config.QUEUE_FILE}; --worker processes will synthesize and assemble them.")
+    elif config.ASSEMBLY_MODE == "files":
+        audio_files = [result["output_file"] for result in successful_results(results, failed_lines)]
+        if audio_files:
+            with timed_stage("assemble"):
+                combine_audio_files(audio_files, output_file)
+    elif config.ASSEMBLY_MODE == "pcm":
+        with timed_stage("assemble"):
+            assemble_pcm(successful_results(results, failed_lines), output_file)
+    else:
+        audio_chunks = (result_audio(result) for result in successful_results(results, failed_lines))
+        # Assembly consumes lines as they are synthesized, so this span covers synthesis too
+        with timed_stage("assemble"):
+            if config.ASSEMBLY_MODE == "pipe":
+                pipe_audio_to_ffmpeg(audio_chunks, output_file)
+            else:
+                write_progressive_output(audio_chunks, output_file, os.path.join(output_dir, config.HLS_DIR) if config.ASSEMBLY_MODE == "hls" else None)
+    if os.path.exists(output_file):
+        count("bytes_written", os.path.getsize(output_file))
+    manifest["assembled"] = not failed_lines and not enqueue
+    save_manifest(output_dir, manifest)
+    if failed_lines:
+        print(f"{len(failed_lines)} line(s) failed to synthesize: {', '.join(str(line) for line in failed_lines)}")
+        if config.CHECKPOINT_RUNS:
+            print(f"Re-run with --resume {output_dir} to retry them.")
+    duration = duration_summary(params, predicted_lines, None if enqueue else output_file) if config.DURATION_CHECK else {}
+    cache_hits = audio_cache_stats["hits"] - hits_before
+    cache_misses = audio_cache_stats["misses"] - misses_before
+    print(f"Audio cache: {cache_hits} hits, {cache_misses} misses")
+    prompt_cache = prompt_cache_summary()
+    print(f"Prompt cache: {prompt_cache['prompt_cache_hit_rate']:.0%} of prompt tokens read from cache, {prompt_cache['prompt_tokens_saved']} input tokens saved")
+    routing = backend_summary()
+    lines_per_backend = ", ".join(f"{tts_backends[backend]['label']} {lines}" for backend, lines in routing["backend_lines"].items())
+    print(f"Lines per backend: {lines_per_backend or 'none'}; {routing['tts_failovers']} failovers, {routing['hedged_requests']} hedged ({routing['hedge_wins']} won by the hedge)")
+
+    # Clean up temporary files (line audio is kept when it is a checkpoint)
+    if not config.CHECKPOINT_RUNS and audio_files:
+        for file in audio_files:
+            os.remove(file)
+        print("Temporary files removed.")
+
+    summary = {
+        "podcast_name": params["podcast_name"],
+        "topic": params["topic"],
+        "seed": params["seed"],
+        "output_file": output_file,
+        "failed_lines": failed_lines,
+        "audio_cache_hits": cache_hits,
+        "audio_cache_misses": cache_misses,
+        **prompt_cache,
+        **routing,
+        "queued_lines": queued_lines,
+        **duration,
+        "seconds": round(time.time() - start_time, 1)
+    }
+    if profile:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        write_profile(output_dir, profiler, snapshot)
+    write_metrics(output_dir, summary)
+    print(f"Run report saved to {os.path.join(output_dir, config.METRICS_REPORT_FILE)}")
+    return summary
+
+def new_run_dir(params):
+    """
+    Return the directory a new run of params checkpoints into.
+    """
+    if not config.CHECKPOINT_RUNS:
+        return "."
+    return os.path.join(config.RUNS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{slugify(params['podcast_name'])}")
+
+def script_run(run_dir=None):
+    """
+    Research and write the script of a run, prompting for a new episode unless run_dir
+    names an existing one. Returns the run directory.
+    """
+    resume = run_dir is not None
+    params = {} if resume else get_user_input()
+    run_dir = run_dir if resume else new_run_dir(params)
+    params, manifest = start_run(params, run_dir, resume)
+    research_text = research_stage(params, manifest, run_dir)
+    for line in script_stage(params, manifest, run_dir, research_text)[0]:
+        pass
+    print(f"\nScript saved in {run_dir}")
+    return run_dir
+
+def synthesize_run(run_dir):
+    """
+    Synthesize every script line of a run into its line file, skipping lines an earlier
+    attempt already rendered, without assembling the episode. Returns the failed line numbers.
+    """
+    params, manifest = start_run({}, run_dir, resume=True)
+    script_lines, normalized = script_stage(params, manifest, run_dir, research_stage(params, manifest, run_dir))
+    lines_dir = os.path.join(run_dir, "lines")
+    os.makedirs(lines_dir, exist_ok=True)
+    print("\nConverting script to audio...")
+    jobs = mark_completed_lines(prepare_lines(script_lines, params["speakers"], True, normalized, params["seed"], lines_dir), manifest)
+    failed_lines = []
+    with timed_stage("synthesize"):
+        for result in synthesize_lines(jobs, on_complete=lambda job, error: record_line(run_dir, manifest, job, error)):
+            if result["error"] is not None:
+                failed_lines.append(result["line"])
+    if failed_lines:
+        print(f"{len(failed_lines)} line(s) failed to synthesize: {', '.join(str(line) for line in failed_lines)}")
+    return failed_lines
+
+def assemble_run(run_dir):
+    """
+    Combine the line files a run's manifest records as done into its output file, in script
+    order. Needs ffmpeg (and NumPy for ASSEMBLY_MODE = "pcm") but no provider SDK.
+    """
+    manifest = load_manifest(run_dir)
+    if manifest is None:
+        raise SystemExit(f"No run in {run_dir} (it has no manifest.json)")
+    records = sorted(((int(line), record) for line, record in manifest["lines"].items()), key=lambda item: item[0])
+    done = [{**record, "line": line, "audio": None} for line, record in records if record["status"] == "done"]
+    failed_lines = [line for line, record in records if record["status"] != "done"]
+    if not done:
+        raise SystemExit(f"No synthesized lines in {run_dir}; run the synthesize stage first")
+    output_file = os.path.join(run_dir, f"podcast.{config.PCM_OUTPUT_FORMAT if config.ASSEMBLY_MODE == 'pcm' else 'mp3'}")
+    with timed_stage("assemble"):
+        if config.ASSEMBLY_MODE == "pcm":
+            assemble_pcm(done, output_file)
+        else:
+            combine_audio_files([record["output_file"] for record in done], output_file)
+    manifest["assembled"] = not failed_lines
+    save_manifest(run_dir, manifest)
+    if failed_lines:
+        print(f"Skipped {len(failed_lines)} line(s) that failed to synthesize: {', '.join(str(line) for line in failed_lines)}")
+    return output_file
+
+def rerender_run(run_dir, script_file=None):
+    """
+    Re-render a run from an edited copy of its script (script_file, by default script.txt in
+    the run directory), then reassemble it. Turns are diffed against the manifest by speaker
+    and text: only inserted and changed turns are synthesized, the rest reuse their audio.
+    Without the script file, the run's script is written there to be edited first.
+    """
+    params, manifest = start_run({}, run_dir, resume=True)
+    script_file = script_file or os.path.join(run_dir, "script.txt")
+    if not os.path.exists(script_file):
+        with open(script_file, "w") as f:
+            f.write(manifest["script"] or "")
+        raise SystemExit(f"Wrote the run's script to {script_file}; edit it and run rerender again.")
+    with open(script_file) as f:
+        script = f.read()
+
+    # The run's seed gives an unchanged turn the same speech patterns, so its text matches the manifest's
+    lines_dir = os.path.join(run_dir, "lines")
+    os.makedirs(lines_dir, exist_ok=True)
+    jobs = list(prepare_lines(script.split("\n"), params["speakers"], True, False, params["seed"], lines_dir))
+    records = [record for _, record in sorted(((int(line), record) for line, record in manifest["lines"].items()), key=lambda item: item[0])]
+    held = {record["output_file"] for record in records}
+    lines = {}
+    matcher = difflib.SequenceMatcher(None, [(record["speaker"], record["text"]) for record in records], [(job["speaker"], job["text"]) for job in jobs], autojunk=False)
+    for tag, old_start, _, new_start, new_end in matcher.get_opcodes():
+        for offset, job in enumerate(jobs[new_start:new_end]):
+            record = records[old_start + offset] if tag == "equal" else None
+            job["resumed"] = reusable_record(record, job)
+            if job["resumed"]:
+                job["output_file"], job["backend"] = record["output_file"], record.get("backend")
+                lines[str(job["line"])] = record
+            else:
+                # A name no earlier record holds, so a changed turn never overwrites audio another turn is reusing
+                job["output_file"] = unused_line_file(job["output_file"], held)
+                held.add(job["output_file"])
+    changed = sum(not job["resumed"] for job in jobs)
+    print(f"Re-rendering {changed} of {len(jobs)} line(s); reusing the audio of the rest.")
+
+    # The reused turns' records are saved with the new script in one write, so an interrupted
+    # rerender (or a later synthesize or render --resume) still reuses them
+    manifest.update(script=script, script_complete=True, lines=lines, duration_checked=True, assembled=False)
+    save_manifest(run_dir, manifest)
+    # Drop the audio of turns the edit removed or replaced; nothing in the manifest points to it any more
+    kept = {job["output_file"] for job in jobs}
+    for record in records:
+        if record["output_file"] not in kept and os.path.exists(record["output_file"]):
+            os.remove(record["output_file"])
+
+    failed_lines = []
+    with timed_stage("synthesize"):
+        for result in synthesize_lines(iter(jobs), on_complete=lambda job, error: record_line(run_dir, manifest, job, error)):
+            if result["error"] is not None:
+                failed_lines.append(result["line"])
+    if failed_lines:
+        print(f"{len(failed_lines)} line(s) failed to synthesize: {', '.join(str(line) for line in failed_lines)}")
+    return assemble_run(run_dir)
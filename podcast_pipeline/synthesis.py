@@ -0,0 +1,134 @@
+"""
+Line preparation and concurrent synthesis of a script's lines.
+"""
+import random
+import os
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+from .metrics import count, timed_stage
+from .text import add_speech_idiosyncrasies, convert_numbers_to_words, normalize_speaker_name
+from .router import generate_speech, synthesize_speech
+
+def prepare_lines(lines, speakers, to_files=True, normalized=False, seed=None, output_dir="."):
+    """
+    Turn "Speaker: text" script lines into synthesis jobs, numbered in script order.
+    Jobs created with to_files=False have no output file and return their audio in memory.
+    Pass normalized=True if the lines already went through convert_numbers_to_words.
+    With a seed, each line's speech patterns depend only on the seed, speaker and text.
+    """
+    line_counter = 1
+    for line in lines:
+        if line.strip() == "":
+            continue
+        # Extract speaker name and text
+        if ":" in line:
+            speaker = line.split(":")[0].strip()
+            text = ":".join(line.split(":")[1:]).strip()
+
+            # Normalize speaker name by removing titles like "Professor"
+            normalized_speaker = normalize_speaker_name(speaker)
+
+            # Convert numbers and symbols to words
+            if not normalized:
+                with timed_stage("normalize", line=line_counter):
+                    text = convert_numbers_to_words(text)
+
+            # Find the voice and personality for the speaker
+            participant = None
+            for candidate in speakers:
+                if normalized_speaker.upper() == candidate["name"].upper():
+                    participant = candidate
+                    break
+            if not participant:
+                print(f"Voice for speaker '{speaker}' not found. Skipping line.")
+                continue
+
+            # Add human-like speech patterns
+            rng = random.Random(f"{seed}:{normalized_speaker}:{text}") if seed is not None else None
+            text = add_speech_idiosyncrasies(text, rng, participant.get("personality"))
+
+            yield {
+                "line": line_counter,
+                "speaker": normalized_speaker,
+                "text": text,
+                "voices": participant["voices"],
+                "output_file": os.path.join(output_dir, f"{normalized_speaker}_line_{line_counter}.{'wav' if config.ASSEMBLY_MODE == 'pcm' else 'mp3'}") if to_files else None
+            }
+            line_counter += 1
+
+def synthesize_line(job):
+    """
+    Generate the audio for a single line job, returning it directly if the job has no output file.
+    """
+    if job.get("resumed"):
+        return None  # Audio is already on disk from an earlier attempt
+    with timed_stage("tts", line=job["line"]):
+        return synthesize_job(job)
+
+def synthesize_job(job):
+    if job["output_file"] is None:
+        audio, job["backend"] = synthesize_speech(job["text"], job["voices"], job.get("backends"))
+        return audio
+    job["backend"] = generate_speech(job["text"], job["output_file"], job["voices"], job.get("backends"))
+
+def collect_result(job, future):
+    """
+    Wait for a line job to finish and record whether it succeeded.
+    """
+    try:
+        return {**job, "audio": future.result(), "error": None}
+    except Exception as e:
+        print(f"Failed to generate audio for line {job['line']} ({job['speaker']}): {e}")
+        count("tts_failures")
+        return {**job, "audio": None, "error": str(e)}
+
+def synthesize_lines(jobs, max_workers=None, on_complete=None):
+    """
+    Synthesize line jobs in parallel and yield their results in script order.
+
+    A feeder thread pulls jobs (which may wait on Claude while the script is written) and
+    submits them, so each result is yielded as soon as it and every earlier line are done,
+    not when the next job arrives. At most 2 * max_workers lines are in flight or waiting
+    to be yielded, so finished audio never piles up far ahead of the consumer. max_workers
+    defaults to TTS_MAX_WORKERS.
+    on_complete(job, error) is called from the worker thread as soon as each line
+    finishes, in whatever order they finish.
+    """
+    max_workers = max_workers or config.TTS_MAX_WORKERS
+    window = threading.Semaphore(2 * max_workers)
+    submitted = queue.Queue()
+    finished = object()
+    stopped = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def feed():
+            try:
+                for job in jobs:
+                    window.acquire()
+                    if stopped.is_set():
+                        return
+                    future = executor.submit(synthesize_line, job)
+                    if on_complete:
+                        future.add_done_callback(lambda future, job=job: on_complete(job, future.exception()))
+                    submitted.put((job, future))
+                submitted.put(finished)
+            except BaseException as e:
+                submitted.put(e)  # Raised in the consumer, as if it had pulled the job itself
+
+        threading.Thread(target=feed, daemon=True).start()
+        try:
+            while True:
+                item = submitted.get()
+                if item is finished:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield collect_result(*item)
+                window.release()
+        finally:
+            # A consumer that stops early must not leave the feeder waiting for room in the window
+            stopped.set()
+            window.release()
@@ -0,0 +1,230 @@
+"""
+Text normalization for speech: numbers spelled out, speech idiosyncrasies and speaker names.
+"""
+import random
+import re  # For regex-based number conversion
+from functools import lru_cache
+
+from . import config
+
+# Number normalization tables
+ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine",
+    "ten", "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"
+]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+SCALES = [(10**12, "trillion"), (10**9, "billion"), (10**6, "million"), (10**3, "thousand")]
+ORDINALS = {"one": "first", "two": "second", "three": "third", "five": "fifth", "eight": "eighth", "nine": "ninth", "twelve": "twelfth"}
+SCALE_WORDS = {"k": "thousand", "thousand": "thousand", "m": "million", "mn": "million", "million": "million",
+               "b": "billion", "bn": "billion", "billion": "billion", "trillion": "trillion"}
+CURRENCIES = {
+    "$": ("dollar", "dollars", "cent", "cents"),
+    "£": ("pound", "pounds", "penny", "pence"),
+    "€": ("euro", "euros", "cent", "cents")
+}
+INTEGER_PATTERN = r"(?:\d{1,3}(?:,\d{3})+|\d+)"
+NUMBER_PATTERN = INTEGER_PATTERN + r"(?:\.\d+)?"
+YEAR_RE = re.compile(r"(?:19|20)\d\d")
+CURRENCY_RE = re.compile(rf"(?P<amount>{NUMBER_PATTERN}) ?(?P<scale>[a-z]*)", re.IGNORECASE)
+RANGE_SPLIT_RE = re.compile(r" ?[-–] ?")
+RANGE_MAX = 1000  # Larger plain numbers joined by a dash ("555-1234") are read digit by digit, like phone numbers
+
+# Every numeric form is one alternative of a single pattern, so a line is normalized in one pass
+NUMBER_TOKEN_RE = re.compile(rf"""
+    (?<![\w.])(?<!\d,)(?:
+        (?P<currency>[$£€]{NUMBER_PATTERN}(?:\ ?(?:thousand|million|billion|trillion|bn|mn|[kmb]))?)
+      | (?P<range>{NUMBER_PATTERN}%?\ ?[-–]\ ?{NUMBER_PATTERN}%?)
+      | (?P<percent>{NUMBER_PATTERN}\ ?%)
+      | (?P<ordinal>{INTEGER_PATTERN}(?:st|nd|rd|th))
+      | (?P<year>(?:19|20)\d\d(?:'?s)?)
+      | (?P<number>{NUMBER_PATTERN})
+    )(?!\w|[.,]\d)
+    | (?P<symbol>%)
+""", re.VERBOSE | re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def num_to_words(number):
+    """
+    Convert a whole number (an int or a digit string, commas allowed) to words.
+    """
+    n = int(str(number).replace(",", ""))
+    if n < 20:
+        return ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return TENS[tens] + (f"-{ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f"{ONES[hundreds]} hundred" + (f" {num_to_words(rest)}" if rest else "")
+    for scale, name in SCALES:
+        if n >= scale:
+            head, rest = divmod(n, scale)
+            return f"{num_to_words(head)} {name}" + (f" {num_to_words(rest)}" if rest else "")
+
+def number_words(token):
+    """
+    Spell out an integer or decimal, reading the decimal digits one by one ("3.14" -> "three point one four").
+    """
+    whole, _, fraction = token.partition(".")
+    words = num_to_words(whole)
+    if fraction:
+        words += " point " + " ".join(ONES[int(digit)] for digit in fraction)
+    return words
+
+def ordinal_words(token):
+    """
+    Spell out an ordinal such as "22nd" -> "twenty-second".
+    """
+    words = num_to_words(token[:-2])
+    cut = max(words.rfind(" "), words.rfind("-")) + 1
+    last = words[cut:]
+    if last in ORDINALS:
+        last = ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return words[:cut] + last
+
+def year_words(token):
+    """
+    Read a 19xx/20xx year (or decade, "1990s") the way it is spoken.
+    """
+    plural = token.lower().endswith("s")
+    century, rest = int(token[:2]), int(token[2:4])
+    if century == 20 and plural and rest >= 10:
+        words = f"twenty {num_to_words(rest)}"  # "2010s" -> "twenty tens"
+    elif century == 20:
+        words = "two thousand" + (f" and {num_to_words(rest)}" if rest else "")
+    elif rest == 0:
+        words = "nineteen hundred"
+    elif rest < 10:
+        words = f"nineteen oh {ONES[rest]}"
+    else:
+        words = f"nineteen {num_to_words(rest)}"
+    if plural:
+        words = words[:-1] + "ies" if words.endswith("y") else words + "s"
+    return words
+
+def currency_words(token):
+    """
+    Spell out an amount of money such as "$3.50" or "$1.5 million".
+    """
+    singular, plural, minor_singular, minor_plural = CURRENCIES[token[0]]
+    match = CURRENCY_RE.fullmatch(token[1:])
+    amount, scale = match.group("amount"), match.group("scale").lower()
+    if scale:
+        return f"{number_words(amount)} {SCALE_WORDS[scale]} {plural}"
+    whole, _, fraction = amount.partition(".")
+    if fraction and len(fraction) != 2:
+        return f"{number_words(amount)} {plural}"
+    whole, minor = int(whole.replace(",", "")), int(fraction or 0)
+    parts = []
+    if whole or not minor:
+        parts.append(f"{num_to_words(whole)} {singular if whole == 1 else plural}")
+    if minor:
+        parts.append(f"{num_to_words(minor)} {minor_singular if minor == 1 else minor_plural}")
+    return " and ".join(parts)
+
+def percent_words(token):
+    """
+    Spell out a percentage such as "3.5%".
+    """
+    return number_words(token.rstrip("% ")) + " percent"
+
+def digit_words(token):
+    """
+    Read a number digit by digit ("555" -> "five five five").
+    """
+    return " ".join(ONES[int(digit)] for digit in token if digit.isdigit())
+
+def range_side(token):
+    """
+    Return whether a number can be one end of a spoken range: a year, a small number,
+    or a quantity written with thousands separators or decimals.
+    """
+    return bool(YEAR_RE.fullmatch(token)) or "," in token or "." in token or int(token) <= RANGE_MAX
+
+def range_words(token):
+    """
+    Spell out a range such as "10-20%", "1990-2005" or "2023-24". Other numbers joined
+    by a dash ("555-1234") are codes rather than ranges and are read digit by digit.
+    """
+    low, high = RANGE_SPLIT_RE.split(token, maxsplit=1)
+    percent = high.endswith("%")
+    low, high = low.rstrip("%"), high.rstrip("%")
+    if YEAR_RE.fullmatch(low) and len(high) == 2 and high.isdigit():
+        # "2023-24" ends in the year the short form names after the first one ("1999-00" in 2000)
+        high = str(int(low[:2] + high) + (100 if int(high) <= int(low[2:]) else 0))
+    if YEAR_RE.fullmatch(low) and YEAR_RE.fullmatch(high):
+        words = f"{year_words(low)} to {year_words(high)}"
+    elif range_side(low) and range_side(high):
+        words = f"{number_words(low)} to {number_words(high)}"
+    else:
+        return f"{digit_words(low)}, {digit_words(high)}" + (" percent" if percent else "")
+    return words + " percent" if percent else words
+
+NUMBER_SPELLERS = {
+    "currency": currency_words,
+    "range": range_words,
+    "percent": percent_words,
+    "ordinal": ordinal_words,
+    "year": year_words,
+    "number": number_words,
+    "symbol": lambda token: " percent"
+}
+
+@lru_cache(maxsize=4096)
+def spell_number_token(kind, token):
+    """
+    Spell out one matched token; common tokens ("10", "2023", "50%") are memoized.
+    """
+    return NUMBER_SPELLERS[kind](token)
+
+def convert_numbers_to_words(text):
+    """
+    Convert numbers and symbols in the text to their spoken equivalents.
+
+    Cardinals, decimals, years, percents, currency, ordinals and ranges are all
+    handled in a single pass of one precompiled pattern, so a whole script can be
+    normalized at once.
+    """
+    return NUMBER_TOKEN_RE.sub(lambda match: spell_number_token(match.lastgroup, match.group(0)), text)
+
+def iter_idiosyncratic_words(words, rng, filler_rate, pause_rate, make_pause):
+    """
+    Yield the words of a line with fillers and pauses mixed in, in a single linear pass.
+    """
+    for word in words:
+        add_filler = rng.random() < filler_rate
+        add_pause = rng.random() < pause_rate
+        if add_pause:
+            yield make_pause()
+        if add_filler:
+            yield rng.choice(config.FILLERS)
+        yield word
+
+def add_speech_idiosyncrasies(text, rng=None, personality=None, pause_style=None):
+    """
+    Add human-like speech patterns (pauses, stutters, filler words).
+
+    Pass a seeded random.Random as rng to get the same result on every run.
+    pause_style "marker" inserts PAUSE_MARKER instead of spoken "..." tokens, which
+    each backend renders its own way when the line is synthesized.
+    """
+    rng = rng or random.Random()
+    pause_style = pause_style or config.PAUSE_STYLE
+    profile = config.IDIOSYNCRASY_PROFILES.get(personality, config.IDIOSYNCRASY_PROFILES["default"])
+    words = text.split()
+    if pause_style == "marker":
+        make_pause = lambda: config.PAUSE_MARKER
+    else:
+        make_pause = lambda: rng.choice(config.PAUSES)
+
+    return " ".join(iter_idiosyncratic_words(words, rng, profile["filler_rate"], profile["pause_rate"], make_pause))
+
+def normalize_speaker_name(speaker):
+    """
+    Strip titles like "Professor" or "Dr." from a speaker name as written in the script.
+    """
+    return " ".join([word for word in speaker.split() if word.lower() not in ["professor", "dr.", "mr.", "ms."]])
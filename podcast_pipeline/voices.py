@@ -0,0 +1,160 @@
+"""
+Voice catalogs and the assignment of voices to speakers.
+"""
+import random
+import os
+import json
+import time
+import threading
+import difflib
+
+from . import config
+from .backends import tts_backends
+
+voice_catalogs = {}
+voice_catalog_lock = threading.Lock()
+
+def load_voice_catalog(backend, refresh=False):
+    """
+    Return a backend's voice catalog, served from VOICE_CATALOG_FILE while it is younger than VOICE_CATALOG_TTL.
+    A stale catalog is still used if refreshing it fails.
+    """
+    with voice_catalog_lock:
+        if not refresh and backend in voice_catalogs:
+            return voice_catalogs[backend]
+        try:
+            with open(config.VOICE_CATALOG_FILE) as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cached = {}
+        entry = cached.get(backend)
+        if refresh or not entry or time.time() - entry["fetched_at"] >= config.VOICE_CATALOG_TTL:
+            try:
+                voices = tts_backends[backend]["fetch_voices"]()
+            except Exception as e:
+                print(f"Failed to fetch {tts_backends[backend]['label']} voices: {e}")
+                voices = None
+            if voices:
+                entry = {"fetched_at": time.time(), "voices": voices}
+                cached[backend] = entry
+                with open(f"{config.VOICE_CATALOG_FILE}.tmp", "w") as f:
+                    json.dump(cached, f, indent=2)
+                os.replace(f"{config.VOICE_CATALOG_FILE}.tmp", config.VOICE_CATALOG_FILE)
+            elif entry:
+                print(f"Using the cached {tts_backends[backend]['label']} voice catalog.")
+        voice_catalogs[backend] = index_voices(entry["voices"] if entry else [], tts_backends[backend]["voice_key"])
+        return voice_catalogs[backend]
+
+def index_voices(voices, voice_key="name"):
+    """
+    Index catalog voices by name, by the key the backend synthesizes with, and by language, gender and style.
+    Languages are indexed both in full ("en-US") and by base language ("en").
+    """
+    catalog = {"voices": voices, "voice_key": voice_key, "name": {}, "id": {}, "language": {}, "gender": {}, "style": {}}
+    for voice in voices:
+        catalog["name"][voice["name"]] = voice
+        catalog["id"][voice[voice_key]] = voice
+        for language in voice["languages"]:
+            for key in {language, language.split("-")[0]}:
+                catalog["language"].setdefault(key.lower(), []).append(voice)
+        catalog["gender"].setdefault(voice["gender"].lower(), []).append(voice)
+        for style in voice["styles"]:
+            catalog["style"].setdefault(style.lower(), []).append(voice)
+    return catalog
+
+def find_voices(catalog, language=None, gender=None, style=None):
+    """
+    Return the catalog voices matching every given criterion.
+    """
+    matches = catalog["voices"]
+    for field, value in (("language", language), ("gender", gender), ("style", style)):
+        if value:
+            names = {voice["name"] for voice in catalog[field].get(value.lower(), [])}
+            matches = [voice for voice in matches if voice["name"] in names]
+    return matches
+
+def assign_voice(backend, gender, personality, taken=(), rng=random):
+    """
+    Pick a backend voice for a speaker: the right language and gender, the styles their personality
+    prefers, and not already used by another speaker when there is a choice.
+    Falls back to DEFAULT_VOICES, or None, when the backend has no catalog.
+    """
+    catalog = load_voice_catalog(backend)
+    voice_key = catalog["voice_key"]
+    candidates = find_voices(catalog, config.VOICE_LANGUAGE, gender) or find_voices(catalog, config.VOICE_LANGUAGE) or catalog["voices"]
+    candidates = [voice for voice in candidates if voice[voice_key] not in taken] or candidates
+    if not candidates:
+        defaults = config.DEFAULT_VOICES.get(backend, {})
+        return defaults.get(gender, defaults.get("Male"))
+    styles = config.PERSONALITY_STYLES.get(backend, {}).get(personality, [])
+
+    def rank(voice):
+        matched = [styles.index(style) for style in voice["styles"] if style in styles]
+        return min(matched) if matched else len(styles)
+
+    best = min(rank(voice) for voice in candidates)
+    return rng.choice(sorted((voice for voice in candidates if rank(voice) == best), key=lambda voice: voice["name"]))[voice_key]
+
+def resolve_voice(backend, voice):
+    """
+    Return the key a backend synthesizes with for a voice given by name or by that key.
+    Raises ValueError, suggesting close matches, if the voice is not in the catalog;
+    voices are accepted as-is when no catalog could be loaded.
+    """
+    catalog = load_voice_catalog(backend)
+    if not catalog["voices"] or voice in catalog["id"]:
+        return voice
+    if voice in catalog["name"]:
+        return catalog["name"][voice][catalog["voice_key"]]
+    suggestions = difflib.get_close_matches(voice, list(catalog["name"]), n=3)
+    hint = f" Did you mean {', '.join(suggestions)}?" if suggestions else ""
+    raise ValueError(f"Unknown {tts_backends[backend]['label']} voice '{voice}'.{hint}")
+
+def voice_display_name(backend, voice):
+    """
+    Return the catalog name of a backend voice, for voices identified by an opaque ID.
+    """
+    return load_voice_catalog(backend)["id"].get(voice, {}).get("name", voice)
+
+def assign_speaker_voices(speaker, gender, personality, speakers, rng=random, backends=None):
+    """
+    Give a speaker a voice on every backend, in order of preference. Voices named in the speaker's
+    "voices" mapping (or the older "voice_name", "voice_id" and "voice" keys) are looked up in the
+    catalogs; the rest are assigned by gender and personality. Backends with no usable voice are left out.
+    """
+    legacy_keys = {"voice_name": "google", "voice_id": "elevenlabs", "voice": "elevenlabs"}
+    requested = dict(speaker.get("voices") or {})
+    for key, backend in legacy_keys.items():
+        if speaker.get(key):
+            requested.setdefault(backend, speaker[key])
+    voices = {}
+    for backend in backends or config.TTS_BACKENDS:
+        if requested.get(backend):
+            voice = resolve_voice(backend, requested[backend])
+        else:
+            voice = assign_voice(backend, gender, personality, [other["voices"].get(backend) for other in speakers], rng)
+        if voice:
+            voices[backend] = voice
+    if not voices:
+        raise ValueError(f"No voice available for {speaker.get('name') or 'a speaker'} on {', '.join(backends or config.TTS_BACKENDS)}")
+    return voices
+
+def choose_speaker_voices(name):
+    """
+    Ask for a speaker's voice on every backend, listing the voices of small catalogs.
+    Pressing Enter picks one from the catalog instead.
+    """
+    voices = {}
+    for backend in config.TTS_BACKENDS:
+        label = tts_backends[backend]["label"]
+        catalog = load_voice_catalog(backend)
+        if 0 < len(catalog["voices"]) <= 50:
+            print(f"\nAvailable {label} voices: {', '.join(sorted(catalog['name']))}")
+        while True:
+            choice = input(f"{label} voice for {name} (Enter to pick one): ").strip()
+            try:
+                voices[backend] = resolve_voice(backend, choice) if choice else None
+                break
+            except ValueError as e:
+                print(e)
+    return voices
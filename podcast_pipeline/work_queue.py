@@ -0,0 +1,194 @@
+"""
+The SQLite work queue shared by --enqueue and --worker processes.
+"""
+import os
+import json
+import sqlite3
+import time
+import threading
+import socket
+from contextlib import closing
+
+from . import config
+from .synthesis import synthesize_line
+from .assembly import assemble_pcm, combine_audio_files
+
+def open_queue():
+    """
+    Open the work queue database, creating its tables on first use.
+    """
+    db = sqlite3.connect(config.QUEUE_FILE, timeout=30, isolation_level=None)
+    db.row_factory = sqlite3.Row
+    db.execute(f"PRAGMA journal_mode={config.QUEUE_JOURNAL_MODE}")
+    db.execute("""CREATE TABLE IF NOT EXISTS episodes (
+        episode_id TEXT PRIMARY KEY, output_file TEXT NOT NULL, assembly_mode TEXT NOT NULL,
+        total_lines INTEGER, status TEXT NOT NULL, worker TEXT, lease_until REAL, failed_lines TEXT, updated_at REAL NOT NULL
+    )""")
+    db.execute("""CREATE TABLE IF NOT EXISTS tasks (
+        episode_id TEXT NOT NULL, line INTEGER NOT NULL, backends TEXT NOT NULL, speaker TEXT NOT NULL, voices TEXT NOT NULL,
+        text TEXT NOT NULL, output_file TEXT NOT NULL, status TEXT NOT NULL, worker TEXT, lease_until REAL,
+        attempts INTEGER NOT NULL DEFAULT 0, error TEXT, created_at REAL NOT NULL, PRIMARY KEY (episode_id, line)
+    )""")
+    db.execute("CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, created_at)")
+    return db
+
+def publish_episode(jobs, output_dir, output_file):
+    """
+    Publish an episode's line jobs to the work queue as they are prepared, so workers can start
+    on the first lines while the script is still being written. Returns the number of lines queued.
+    Re-publishing an episode leaves lines that are already queued untouched.
+    """
+    episode_id = os.path.abspath(output_dir)
+    with closing(open_queue()) as db:
+        db.execute(
+            "INSERT OR REPLACE INTO episodes (episode_id, output_file, assembly_mode, total_lines, status, updated_at) VALUES (?, ?, ?, NULL, 'synthesizing', ?)",
+            (episode_id, os.path.abspath(output_file), config.ASSEMBLY_MODE, time.time())
+        )
+        total = 0
+        for job in jobs:
+            db.execute(
+                "INSERT OR IGNORE INTO tasks (episode_id, line, backends, speaker, voices, text, output_file, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?)",
+                (episode_id, job["line"], f",{','.join(job['voices'])},", job["speaker"], json.dumps(job["voices"]), job["text"], os.path.abspath(job["output_file"]), time.time())
+            )
+            total += 1
+        db.execute("UPDATE episodes SET total_lines = ?, updated_at = ? WHERE episode_id = ?", (total, time.time(), episode_id))
+    return total
+
+def claim_task(db, worker_id):
+    """
+    Lease the oldest pending line, or one whose lease expired, to worker_id. Returns the task or None.
+    Only lines with a voice on one of TTS_BACKENDS are claimed.
+    Lines whose lease expired after their last attempt are marked failed.
+    """
+    now = time.time()
+    # tasks.backends is ",google,elevenlabs,", so each backend is matched as ",name,"
+    backend_filter = " OR ".join(["instr(backends, ?) > 0"] * len(config.TTS_BACKENDS))
+    backend_names = [f",{backend}," for backend in config.TTS_BACKENDS]
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        db.execute(
+            "UPDATE tasks SET status = 'failed', error = 'lease expired' WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+            (now, config.QUEUE_MAX_ATTEMPTS)
+        )
+        task = db.execute(
+            f"SELECT * FROM tasks WHERE ({backend_filter}) AND (status = 'pending' OR (status = 'leased' AND lease_until < ?)) ORDER BY created_at, line LIMIT 1",
+            (*backend_names, now)
+        ).fetchone()
+        if task is not None:
+            db.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE episode_id = ? AND line = ?",
+                (worker_id, now + config.QUEUE_LEASE_SECONDS, task["episode_id"], task["line"])
+            )
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    if task is None:
+        return None
+    return {**task, "status": "leased", "worker": worker_id, "attempts": task["attempts"] + 1}
+
+def complete_task(db, task, worker_id, error=None):
+    """
+    Record a leased line's result. A failed line goes back to the queue until it runs out of attempts.
+    Nothing is recorded if the lease was lost to another worker in the meantime.
+    """
+    if error is None:
+        status = "done"
+    else:
+        status = "failed" if task["attempts"] >= config.QUEUE_MAX_ATTEMPTS else "pending"
+    db.execute(
+        "UPDATE tasks SET status = ?, error = ?, lease_until = NULL WHERE episode_id = ? AND line = ? AND worker = ? AND status = 'leased'",
+        (status, str(error) if error else None, task["episode_id"], task["line"], worker_id)
+    )
+
+def claim_assembly(db, worker_id, episode_id=None):
+    """
+    Lease an episode whose lines have all finished (or failed for good) for assembly. Returns it or None.
+    """
+    now = time.time()
+    episodes = [episode_id] if episode_id else [row["episode_id"] for row in db.execute(
+        "SELECT episode_id FROM episodes WHERE status = 'synthesizing' OR (status = 'assembling' AND lease_until < ?)",
+        (now,)
+    )]
+    for candidate in episodes:
+        claimed = db.execute(
+            """UPDATE episodes SET status = 'assembling', worker = ?, lease_until = ?, updated_at = ?
+            WHERE episode_id = ? AND total_lines IS NOT NULL
+            AND (status = 'synthesizing' OR (status = 'assembling' AND lease_until < ?))
+            AND NOT EXISTS (SELECT 1 FROM tasks WHERE episode_id = ? AND status IN ('pending', 'leased'))""",
+            (worker_id, now + config.QUEUE_LEASE_SECONDS, now, candidate, now, candidate)
+        ).rowcount
+        if claimed:
+            return dict(db.execute("SELECT * FROM episodes WHERE episode_id = ?", (candidate,)).fetchone())
+    return None
+
+def assemble_queued_episode(db, episode):
+    """
+    Combine the finished lines of a queued episode into its output file, in script order.
+    """
+    tasks = [dict(task) for task in db.execute("SELECT * FROM tasks WHERE episode_id = ? ORDER BY line", (episode["episode_id"],))]
+    failed_lines = [task["line"] for task in tasks if task["status"] != "done"]
+    done = [{**task, "audio": None} for task in tasks if task["status"] == "done"]
+    try:
+        if done and episode["assembly_mode"] == "pcm":
+            assemble_pcm(done, episode["output_file"])
+        elif done:
+            combine_audio_files([task["output_file"] for task in done], episode["output_file"])
+        status = "done" if not failed_lines else "partial"
+    except Exception as e:
+        print(f"Failed to assemble {episode['episode_id']}: {e}")
+        status = "failed"
+    db.execute(
+        "UPDATE episodes SET status = ?, failed_lines = ?, lease_until = NULL, updated_at = ? WHERE episode_id = ?",
+        (status, json.dumps(failed_lines), time.time(), episode["episode_id"])
+    )
+    print(f"Episode {episode['episode_id']}: {status} ({len(done)}/{len(tasks)} lines)")
+
+def worker_loop(worker_id, idle_timeout=None):
+    """
+    Claim, synthesize and record lines until the queue has been idle for idle_timeout seconds
+    (forever if None), assembling each episode as soon as its last line is finished.
+    """
+    with closing(open_queue()) as db:
+        idle_since = time.time()
+        while idle_timeout is None or time.time() - idle_since < idle_timeout:
+            task = claim_task(db, worker_id)
+            if task is None:
+                episode = claim_assembly(db, worker_id)
+                if episode is None:
+                    time.sleep(config.QUEUE_POLL_SECONDS)
+                    continue
+                assemble_queued_episode(db, episode)
+            else:
+                job = {
+                    "line": task["line"], "speaker": task["speaker"], "text": task["text"], "voices": json.loads(task["voices"]),
+                    "backends": config.TTS_BACKENDS, "output_file": task["output_file"]
+                }
+                os.makedirs(os.path.dirname(task["output_file"]), exist_ok=True)
+                try:
+                    synthesize_line(job)
+                    complete_task(db, task, worker_id)
+                except Exception as e:
+                    print(f"Failed to generate audio for line {task['line']} of {task['episode_id']}: {e}")
+                    complete_task(db, task, worker_id, e)
+                episode = claim_assembly(db, worker_id, task["episode_id"])
+                if episode is not None:
+                    assemble_queued_episode(db, episode)
+            idle_since = time.time()
+
+def run_worker(threads=None, idle_timeout=None):
+    """
+    Synthesize lines from the work queue with several threads (default TTS_MAX_WORKERS). Start as many worker processes,
+    on as many machines sharing QUEUE_FILE, as the providers' quotas allow.
+    """
+    threads = threads or config.TTS_MAX_WORKERS
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    print(f"Worker {worker_id} polling {config.QUEUE_FILE} with {threads} threads...")
+    workers = [
+        threading.Thread(target=worker_loop, args=(f"{worker_id}:{i}", idle_timeout))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
@@ -0,0 +1,19 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from podcast_pipeline import assembly, config
+
+
+def test_mix_lines_crossfade_keeps_a_short_final_line(monkeypatch):
+    assembly.load_numpy()
+    monkeypatch.setattr(config, "PCM_SAMPLE_RATE", 24000)
+    monkeypatch.setattr(config, "PCM_GAP_SECONDS", -0.3)
+    long_line = np.full(24000, 0.1, dtype=np.float32)
+    short_line = np.full(2400, 0.1, dtype=np.float32)
+
+    mixed = assembly.mix_lines([("Alice", long_line), ("Bob", short_line)])
+
+    # The short line starts 0.3 s before the long one ends and finishes inside it
+    assert len(mixed) == 24000
+    assert mixed[16800:19200].min() > mixed[:16800].max()
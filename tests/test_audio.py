@@ -0,0 +1,10 @@
+import io
+import wave
+
+from podcast_pipeline import audio, config
+
+
+def test_pcm_to_wav_follows_the_configured_sample_rate(monkeypatch):
+    monkeypatch.setattr(config, "PCM_SAMPLE_RATE", 16000)
+    with wave.open(io.BytesIO(audio.pcm_to_wav(b"\x00\x00" * 160))) as wav:
+        assert wav.getframerate() == 16000
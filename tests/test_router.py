@@ -0,0 +1,31 @@
+import pytest
+
+from podcast_pipeline import router
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    router.backend_stats.clear()
+    yield
+    router.backend_stats.clear()
+
+
+def test_preferred_backend_stays_first_while_healthy():
+    order = []
+    for _ in range(10):
+        ranked = router.rank_backends(["fast_pref", "other"])
+        order.append(ranked[0])
+        router.record_backend_result(ranked[0], 0.05)
+    assert order == ["fast_pref"] * 10
+    assert router.rank_backends(["fast_pref", "other"]) == ["fast_pref", "other"]
+
+
+def test_untried_preferred_backend_is_not_skipped():
+    router.record_backend_result("other", 0.01)
+    assert router.rank_backends(["fast_pref", "other"])[0] == "fast_pref"
+
+
+def test_switches_to_a_much_faster_backend():
+    router.record_backend_result("slow_pref", 1.0)
+    router.record_backend_result("other", 0.1)
+    assert router.rank_backends(["slow_pref", "other"]) == ["other", "slow_pref"]